@@ -4,13 +4,14 @@ Simple demonstration of federated averaging for distributed ML
 """
 
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import copy
 
 class LocalClient:
     """Simulates a local client with private data"""
 
-    def __init__(self, client_id: int, data_size: int = 100):
+    def __init__(self, client_id: int, data_size: int = 100,
+                 sufficient_statistics: bool = False):
         self.client_id = client_id
         self.data_size = data_size
 
@@ -25,6 +26,43 @@ class LocalClient:
         # Training history
         self.loss_history = []
 
+        # Train and evaluate from centered XᵀX, Xᵀy, ... instead of the raw rows
+        self.sufficient_statistics = sufficient_statistics
+        self._statistics = None
+
+    def statistics(self) -> Tuple[np.ndarray, np.ndarray, float, np.ndarray, float, int]:
+        """Centered XᵀX, Xᵀy and yᵀy, the means of x and y, and the row count
+
+        X and y are centered on their means first, so large offsets do not
+        cancel out of the loss. Computed once and reused until `X` or `y`
+        is replaced.
+        """
+        if (self._statistics is None or self._statistics[0] is not self.X
+                or self._statistics[1] is not self.y):
+            X, y = self.X, self.y
+            mean_x, mean_y = X.mean(axis=0).reshape(-1, 1), float(y.mean())
+            X_c, y_c = X - mean_x.T, y - mean_y
+            self._statistics = (X, y, X_c.T @ X_c, X_c.T @ y_c, (y_c.T @ y_c).item(),
+                                mean_x, mean_y, X.shape[0])
+        return self._statistics[2:]
+
+    def _loss_and_gradients_from_statistics(self) -> Tuple[float, np.ndarray, float]:
+        """MSE and its gradients in O(d²), expanded from the centered statistics"""
+        Cxx, Cxy, Cyy, mean_x, mean_y, n = self.statistics()
+        w, b = self.weights, np.asarray(self.bias).item()
+
+        Cxx_w = Cxx @ w
+        mean_error = (mean_x.T @ w).item() + b - mean_y
+
+        # Σ(Xw + b - y)² = wᵀCxxw - 2wᵀCxy + Cyy + n·(x̄ᵀw + b - ȳ)²; clamped against rounding
+        squared_error = ((w.T @ Cxx_w).item() - 2 * (w.T @ Cxy).item() + Cyy
+                         + n * mean_error * mean_error)
+        loss = max(squared_error, 0.0) / n
+
+        d_weights = 2 * (Cxx_w - Cxy + n * mean_error * mean_x) / self.data_size
+        d_bias = 2 * mean_error
+        return loss, d_weights, d_bias
+
     def train_local_epoch(self, global_weights: np.ndarray, global_bias: np.ndarray,
                          learning_rate: float = 0.01, epochs: int = 5):
         """Train local model for several epochs"""
@@ -34,6 +72,13 @@ class LocalClient:
         self.bias = copy.deepcopy(global_bias)
 
         for epoch in range(epochs):
+            if self.sufficient_statistics:
+                loss, d_weights, d_bias = self._loss_and_gradients_from_statistics()
+                self.loss_history.append(loss)
+                self.weights -= learning_rate * d_weights
+                self.bias -= learning_rate * d_bias
+                continue
+
             # Forward pass
             predictions = self.X @ self.weights + self.bias
 
@@ -53,6 +98,9 @@ class LocalClient:
 
     def evaluate(self) -> float:
         """Evaluate current model on local data"""
+        if self.sufficient_statistics:
+            return self._loss_and_gradients_from_statistics()[0]
+
         predictions = self.X @ self.weights + self.bias
         loss = np.mean((predictions - self.y) ** 2)
         return loss
@@ -61,7 +109,7 @@ class LocalClient:
 class FederatedServer:
     """Central server coordinating federated learning"""
 
-    def __init__(self, n_clients: int):
+    def __init__(self, n_clients: int, sufficient_statistics: bool = False):
         self.n_clients = n_clients
 
         # Initialize global model
@@ -70,7 +118,8 @@ class FederatedServer:
 
         # Create clients
         self.clients: List[LocalClient] = [
-            LocalClient(client_id=i) for i in range(n_clients)
+            LocalClient(client_id=i, sufficient_statistics=sufficient_statistics)
+            for i in range(n_clients)
         ]
 
         # Training history
@@ -100,10 +149,119 @@ class FederatedServer:
         self.global_weights = np.sum(weights_array * weight_coeffs, axis=0)
         self.global_bias = np.sum(biases_array * bias_coeffs)
 
+    def train_clients_batched(self, clients: List[LocalClient], learning_rate: float = 0.01,
+                              epochs: int = 5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Train many clients from the global model at once with batched matrix products
+
+        The clients' data are stacked into (clients, rows, features) arrays, so
+        each epoch is a few NumPy calls for all clients together. Clients with
+        fewer rows are zero-padded and the padding is masked out of the loss
+        and gradients. If every client uses sufficient statistics, their
+        stacked statistics are used instead and no rows are touched. Client
+        models and loss histories are updated as train_local_epoch() would,
+        up to floating-point rounding. Returns the stacked weights, biases
+        and final losses.
+        """
+        k = len(clients)
+        data_sizes = np.array([client.data_size for client in clients]).reshape(k, 1, 1)
+
+        # Every client starts from its own copy of the global model
+        weights = np.repeat(self.global_weights[np.newaxis], k, axis=0)
+        bias = np.repeat(np.reshape(self.global_bias, (1, 1, -1)), k, axis=0)
+
+        if all(client.sufficient_statistics for client in clients):
+            losses = self._train_statistics_batched(clients, weights, bias, data_sizes,
+                                                    learning_rate, epochs)
+        else:
+            losses = self._train_rows_batched(clients, weights, bias, data_sizes,
+                                              learning_rate, epochs)
+
+        # Same shapes as the per-client path returns
+        biases = bias.reshape((k,) + np.shape(self.global_bias))
+        for i, client in enumerate(clients):
+            client.weights = weights[i]
+            client.bias = biases[i]
+            client.loss_history.extend(losses[:, i])
+
+        return weights, biases, losses[-1]
+
+    @staticmethod
+    def _train_rows_batched(clients: List[LocalClient], weights: np.ndarray, bias: np.ndarray,
+                            data_sizes: np.ndarray, learning_rate: float, epochs: int) -> np.ndarray:
+        """Gradient descent on stacked, padded client rows; updates weights and bias in place"""
+        k = len(clients)
+        rows = np.array([client.X.shape[0] for client in clients])
+        n_rows = rows.max()
+
+        if (rows == n_rows).all():
+            X = np.stack([client.X for client in clients])
+            y = np.stack([client.y for client in clients])
+            mask = None
+        else:
+            X = np.zeros((k, n_rows, clients[0].X.shape[1]))
+            y = np.zeros((k, n_rows, 1))
+            mask = np.zeros((k, n_rows, 1))
+            for i, client in enumerate(clients):
+                X[i, :rows[i]] = client.X
+                y[i, :rows[i]] = client.y
+                mask[i, :rows[i]] = 1.0
+
+        X_T = X.transpose(0, 2, 1)
+        losses = np.empty((epochs, k))
+
+        for epoch in range(epochs):
+            errors = X @ weights + bias - y
+            if mask is not None:
+                errors *= mask
+
+            losses[epoch] = np.sum(errors ** 2, axis=(1, 2)) / rows
+
+            d_weights = 2 * (X_T @ errors) / data_sizes
+            d_bias = 2 * np.sum(errors, axis=(1, 2), keepdims=True) / rows.reshape(k, 1, 1)
+
+            weights -= learning_rate * d_weights
+            bias -= learning_rate * d_bias
+
+        return losses
+
+    @staticmethod
+    def _train_statistics_batched(clients: List[LocalClient], weights: np.ndarray,
+                                  bias: np.ndarray, data_sizes: np.ndarray,
+                                  learning_rate: float, epochs: int) -> np.ndarray:
+        """Gradient descent on stacked sufficient statistics; updates weights and bias in place"""
+        k = len(clients)
+        Cxx, Cxy, Cyy, mean_x, mean_y, n = (np.array(column) for column in
+                                            zip(*(client.statistics() for client in clients)))
+        Cyy, mean_y, n = Cyy.reshape(k, 1, 1), mean_y.reshape(k, 1, 1), n.reshape(k, 1, 1)
+        mean_x_T = mean_x.transpose(0, 2, 1)
+        losses = np.empty((epochs, k))
+
+        for epoch in range(epochs):
+            weights_T = weights.transpose(0, 2, 1)
+            Cxx_w = Cxx @ weights
+            mean_error = mean_x_T @ weights + bias - mean_y
+
+            squared_error = (weights_T @ Cxx_w - 2 * (weights_T @ Cxy) + Cyy
+                             + n * mean_error * mean_error)
+            losses[epoch] = (np.maximum(squared_error, 0.0) / n).reshape(k)
+
+            d_weights = 2 * (Cxx_w - Cxy + n * mean_error * mean_x) / data_sizes
+            d_bias = 2 * mean_error
+
+            weights -= learning_rate * d_weights
+            bias -= learning_rate * d_bias
+
+        return losses
+
     def train_round(self, learning_rate: float = 0.01,
                    local_epochs: int = 5,
-                   client_fraction: float = 1.0) -> float:
-        """Execute one round of federated training"""
+                   client_fraction: float = 1.0,
+                   batched: bool = False) -> float:
+        """Execute one round of federated training
+
+        With `batched`, all selected clients train together through
+        train_clients_batched() instead of one after another.
+        """
 
         # Select clients for this round
         n_selected = max(1, int(self.n_clients * client_fraction))
@@ -112,21 +270,24 @@ class FederatedServer:
         # Train selected clients
         client_weights = []
         client_biases = []
-        client_sizes = []
+        client_sizes = [client.data_size for client in selected_clients]
         client_losses = []
 
-        for client in selected_clients:
-            weights, bias, loss = client.train_local_epoch(
-                self.global_weights,
-                self.global_bias,
-                learning_rate,
-                local_epochs
-            )
-
-            client_weights.append(weights)
-            client_biases.append(bias)
-            client_sizes.append(client.data_size)
-            client_losses.append(loss)
+        if batched:
+            client_weights, client_biases, client_losses = self.train_clients_batched(
+                list(selected_clients), learning_rate, local_epochs)
+        else:
+            for client in selected_clients:
+                weights, bias, loss = client.train_local_epoch(
+                    self.global_weights,
+                    self.global_bias,
+                    learning_rate,
+                    local_epochs
+                )
+
+                client_weights.append(weights)
+                client_biases.append(bias)
+                client_losses.append(loss)
 
         # Aggregate models
         self.weighted_federated_averaging(client_weights, client_biases, client_sizes)
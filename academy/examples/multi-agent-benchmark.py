@@ -0,0 +1,272 @@
+"""
+Multi-Agent System Benchmark
+Measures how MultiAgentSystem scales with agents, task load, role mix and message traffic
+
+Usage:
+    python multi-agent-benchmark.py --quick
+    python multi-agent-benchmark.py --agents 10 1000 100000 1000000 --traffic direct broadcast \
+        --output mas_benchmark.json
+    python multi-agent-benchmark.py --quick --compare mas_benchmark.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# multi-agent-system.py is not importable by name because of the hyphen
+_spec = importlib.util.spec_from_file_location(
+    "multi_agent_system",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "multi-agent-system.py"))
+mas_module = importlib.util.module_from_spec(_spec)
+sys.modules["multi_agent_system"] = mas_module
+_spec.loader.exec_module(mas_module)
+
+AgentRole = mas_module.AgentRole
+Message = mas_module.Message
+
+# Relative share of each role among the agents
+ROLE_MIXES = {
+    'uniform': {role: 1.0 for role in AgentRole},
+    'scarce_coordinator': {AgentRole.EXPLORER: 3.0, AgentRole.ANALYZER: 3.0,
+                           AgentRole.EXECUTOR: 3.0, AgentRole.COORDINATOR: 1.0},
+    'executor_heavy': {AgentRole.EXPLORER: 1.0, AgentRole.ANALYZER: 1.0,
+                       AgentRole.EXECUTOR: 6.0, AgentRole.COORDINATOR: 1.0},
+}
+
+# Extra messages injected before every step: direct messages per agent, and broadcasts per step.
+# A broadcast reaches every agent, so a few of them already dominate delivery.
+TRAFFIC = {
+    'none': (0.0, 0),
+    'direct': (0.1, 0),
+    'broadcast': (0.0, 4),
+}
+
+ASSIGNMENTS = {
+    'random': mas_module.RandomAssignment,
+    'matching': mas_module.MatchingAssignment,
+}
+
+FULL_AGENTS = [10, 1000, 100_000, 1_000_000]
+QUICK_AGENTS = [10, 1000]
+ARRIVAL_RATES = [0.01, 0.05]  # New tasks per step, as a fraction of the agent count
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def build_system(n_agents: int, role_mix: str, assignment: str):
+    """Create a system with `n_agents` agents drawn from a role mix"""
+    weights = ROLE_MIXES[role_mix]
+    roles = list(weights)
+    mas = mas_module.MultiAgentSystem(assignment=ASSIGNMENTS[assignment](),
+                                      profiler=mas_module.StepProfiler(trace=False))
+
+    for role in random.choices(roles, weights=[weights[role] for role in roles], k=n_agents):
+        mas.add_agent(role, ["generic"])
+    return mas
+
+
+def add_arrivals(mas, n_tasks: int):
+    roles = list(AgentRole)
+    for _ in range(n_tasks):
+        mas.add_task(random.uniform(0.5, 3.0), random.sample(roles, random.randint(1, 3)))
+
+
+def add_traffic(mas, traffic: str, step: int):
+    """Queue this step's extra direct messages and broadcasts"""
+    direct_per_agent, broadcasts = TRAFFIC[traffic]
+    n_agents = len(mas.agents)
+
+    for _ in range(int(direct_per_agent * n_agents)):
+        sender, receiver = random.randrange(n_agents), random.randrange(n_agents)
+        mas.message_queue.append(Message(sender, receiver, "knowledge_share",
+                                         {"knowledge": {f"hint_{sender}": step}}))
+
+    for _ in range(broadcasts):
+        agent = mas.agents[random.randrange(n_agents)]
+        agent.knowledge["status"] = step
+        mas.message_queue.append(agent.share_knowledge("status"))
+
+
+def run_case(n_agents: int, arrival_rate: float, role_mix: str, traffic: str,
+             steps: int, assignment: str, seed: int) -> Dict:
+    """Run one workload configuration and collect its metrics"""
+    random.seed(seed)
+    np.random.seed(seed)
+
+    start = time.perf_counter()
+    mas = build_system(n_agents, role_mix, assignment)
+    setup = time.perf_counter() - start
+
+    arrivals = max(1, round(arrival_rate * n_agents))
+    elapsed = 0.0
+    for step in range(steps):
+        add_arrivals(mas, arrivals)
+        add_traffic(mas, traffic, step)
+
+        start = time.perf_counter()
+        mas.step()
+        elapsed += time.perf_counter() - start
+
+    profile = mas.profiler.summary()
+    completed = profile['counters'].get('tasks_completed', 0)
+    delivered = profile['counters'].get('messages_delivered', 0)
+    stats = mas.get_statistics()
+
+    return {
+        'n_agents': n_agents,
+        'arrival_rate': arrival_rate,
+        'role_mix': role_mix,
+        'traffic': traffic,
+        'assignment': assignment,
+        'steps': steps,
+        'setup_seconds': setup,
+        'seconds': elapsed,
+        'steps_per_sec': steps / elapsed,
+        'tasks_completed_per_sec': completed / elapsed,
+        'messages_delivered_per_sec': delivered / elapsed,
+        'tasks_completed': completed,
+        'messages_delivered': delivered,
+        'active_tasks': stats['active_tasks'],
+        'busy_agents': stats['busy_agents'],
+        'phase_seconds': {phase: p['total'] for phase, p in profile['phases'].items()},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(**case) -> Dict:
+    """Run one case in a fresh worker process so peak RSS is measured per case"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(run_case, **case).result()
+
+
+def run_suite(agents: List[int], arrival_rates: List[float], role_mixes: List[str],
+              traffic: List[str], steps: int, assignment: str, seed: int,
+              repeat: int = 1) -> List[Dict]:
+    """Sweep all workload configurations
+
+    Each configuration runs `repeat` times and the fastest run is kept.
+    """
+    results = []
+
+    for n_agents in agents:
+        for rate in arrival_rates:
+            for role_mix in role_mixes:
+                for kind in traffic:
+                    case = max((run_isolated(n_agents=n_agents, arrival_rate=rate,
+                                             role_mix=role_mix, traffic=kind, steps=steps,
+                                             assignment=assignment, seed=seed)
+                                for _ in range(repeat)),
+                               key=lambda c: c['steps_per_sec'])
+                    results.append(case)
+                    print(f"  agents={n_agents:8d} rate={rate:<5} {role_mix:18s} {kind:9s} | "
+                          f"{case['steps_per_sec']:9.1f} steps/s | "
+                          f"{case['tasks_completed_per_sec']:10.0f} tasks/s | "
+                          f"{case['messages_delivered_per_sec']:12.0f} msgs/s | "
+                          f"{case['peak_rss_mb'] or 0:8.1f} MB")
+
+    return results
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    """List configurations whose steps/sec dropped more than `tolerance` vs a baseline file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(case):
+        return (case['n_agents'], case['arrival_rate'], case['role_mix'],
+                case['traffic'], case['assignment'])
+
+    previous = {key(case): case for case in baseline['results']}
+    regressions = []
+
+    for case in results:
+        old = previous.get(key(case))
+        if old is None:
+            continue
+
+        ratio = case['steps_per_sec'] / old['steps_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append(f"{key(case)}: {ratio:.2f}x steps/sec of baseline")
+
+    return regressions
+
+
+def metadata(args: argparse.Namespace) -> Dict:
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'steps': args.steps,
+        'assignment': args.assignment,
+        'seed': args.seed,
+        'repeat': args.repeat,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark MultiAgentSystem")
+    parser.add_argument('--agents', nargs='+', type=int, default=None)
+    parser.add_argument('--arrival-rates', nargs='+', type=float, default=ARRIVAL_RATES,
+                        help="new tasks per step as a fraction of the agent count")
+    parser.add_argument('--role-mixes', nargs='+', default=['uniform', 'scarce_coordinator'],
+                        choices=list(ROLE_MIXES))
+    parser.add_argument('--traffic', nargs='+', default=['direct', 'broadcast'],
+                        choices=list(TRAFFIC))
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--assignment', default='random', choices=list(ASSIGNMENTS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per configuration (fastest kept)")
+    parser.add_argument('--quick', action='store_true', help="small sweep for smoke testing")
+    parser.add_argument('--output', default='mas_benchmark.json')
+    parser.add_argument('--compare', metavar='BASELINE_JSON',
+                        help="report configurations slower than a previous run")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed steps/sec drop before --compare flags a regression")
+    args = parser.parse_args(argv)
+
+    agents = args.agents or (QUICK_AGENTS if args.quick else FULL_AGENTS)
+
+    print("🤖 Multi-Agent System Benchmark\n")
+    results = run_suite(agents, args.arrival_rates, args.role_mixes, args.traffic,
+                        args.steps, args.assignment, args.seed, args.repeat)
+
+    with open(args.output, 'w') as f:
+        json.dump({'metadata': metadata(args), 'results': results}, f, indent=2)
+    print(f"\n📊 Results written to '{args.output}'")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"⚠️  Regression: {line}")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,9 +4,15 @@ Collaborative task solving with autonomous agents
 """
 
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import Awaitable, Callable, List, Dict, Optional, Set, Tuple
 from enum import Enum
+import asyncio
+from collections import deque
+import heapq
+import json
+import multiprocessing as mp
 import random
+import time
 
 class AgentRole(Enum):
     """Different agent roles in the system"""
@@ -25,6 +31,7 @@ class Task:
         self.assigned_agents: List['Agent'] = []
         self.progress = 0.0
         self.completed = False
+        self.created_at = 0  # Timestep when the task was added
 
     def can_be_completed(self) -> bool:
         """Check if all required roles are assigned"""
@@ -32,15 +39,18 @@ class Task:
         required_roles = set(self.requirements)
         return required_roles.issubset(assigned_roles)
 
+    def progress_step(self) -> float:
+        """Progress made by one agent's work step"""
+        # Progress depends on team size and task complexity
+        team_efficiency = len(self.assigned_agents) / len(self.requirements)
+        return team_efficiency / (self.complexity * 10)
+
     def execute_step(self) -> float:
         """Execute one step of the task"""
         if not self.can_be_completed():
             return 0.0
 
-        # Progress depends on team size and task complexity
-        team_efficiency = len(self.assigned_agents) / len(self.requirements)
-        progress_step = team_efficiency / (self.complexity * 10)
-
+        progress_step = self.progress_step()
         self.progress = min(1.0, self.progress + progress_step)
 
         if self.progress >= 1.0:
@@ -50,7 +60,13 @@ class Task:
 
 
 class Message:
-    """Communication message between agents"""
+    """Communication message between agents
+
+    A broadcast is delivered as one shared object to every subscriber, so
+    receivers must treat messages as read-only.
+    """
+
+    __slots__ = ('sender_id', 'receiver_id', 'message_type', 'content')
 
     def __init__(self, sender_id: int, receiver_id: Optional[int],
                  message_type: str, content: Dict):
@@ -60,18 +76,82 @@ class Message:
         self.content = content
 
 
+class Blackboard:
+    """Shared, versioned knowledge store
+
+    Each fact is stored once no matter how many agents read it, so sharing
+    costs O(1) instead of copying the fact into every agent. Every write
+    bumps `version` and is appended to a changelog, and changes_since(v)
+    returns what changed after version v without scanning the other facts.
+    Agents keep private facts in their own `knowledge`, which shadows the
+    blackboard when both hold a key.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.facts: Dict = {}
+        self._changelog: List = []  # Key written at version i + 1
+
+    def write(self, key, value) -> int:
+        """Publish a fact and return the new version"""
+        self.facts[key] = value
+        self._changelog.append(key)
+        self.version += 1
+        return self.version
+
+    def get(self, key, default=None):
+        return self.facts.get(key, default)
+
+    def changes_since(self, version: int) -> Dict:
+        """Current values of the facts written after `version`"""
+        return {key: self.facts[key] for key in self._changelog[version:]}
+
+    def __contains__(self, key) -> bool:
+        return key in self.facts
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+
 class Agent:
     """Autonomous agent in the multi-agent system"""
 
+    # Broadcast message types this agent acts on in process_messages()
+    SUBSCRIPTIONS = ("task_assignment", "knowledge_share", "help_request")
+
     def __init__(self, agent_id: int, role: AgentRole, capabilities: List[str]):
         self.agent_id = agent_id
         self.role = role
         self.capabilities = capabilities
-        self.current_task: Optional[Task] = None
+        self.observer: Optional['MultiAgentSystem'] = None  # Notified of state changes
+        self._current_task: Optional[Task] = None
         self.messages: List[Message] = []
-        self.knowledge: Dict = {}
+        self.knowledge: Dict = {}  # Private facts; shared ones live on the blackboard
+        self.blackboard: Optional[Blackboard] = None
         self.performance_score = 0.0
 
+    @property
+    def current_task(self) -> Optional[Task]:
+        return self._current_task
+
+    @current_task.setter
+    def current_task(self, task: Optional[Task]):
+        was_idle = self._current_task is None
+        self._current_task = task
+        if self.observer is not None and was_idle != (task is None):
+            self.observer.on_agent_idle_changed(self, task is None)
+
+    @property
+    def performance_score(self) -> float:
+        return self._performance_score
+
+    @performance_score.setter
+    def performance_score(self, score: float):
+        previous = getattr(self, '_performance_score', 0.0)
+        self._performance_score = score
+        if self.observer is not None:
+            self.observer.on_agent_performance_changed(self, score - previous)
+
     def receive_message(self, message: Message):
         """Receive a message from another agent"""
         self.messages.append(message)
@@ -119,9 +199,24 @@ class Agent:
 
         return None
 
+    def recall(self, knowledge_key: str, default=None):
+        """Look up a fact in private knowledge first, then on the blackboard"""
+        if knowledge_key in self.knowledge:
+            return self.knowledge[knowledge_key]
+        if self.blackboard is not None:
+            return self.blackboard.get(knowledge_key, default)
+        return default
+
     def share_knowledge(self, knowledge_key: str) -> Optional[Message]:
-        """Share knowledge with other agents"""
+        """Share knowledge with other agents
+
+        With a blackboard the fact moves there in O(1) and no message is
+        needed, so None is returned.
+        """
         if knowledge_key in self.knowledge:
+            if self.blackboard is not None:
+                self.blackboard.write(knowledge_key, self.knowledge.pop(knowledge_key))
+                return None
             return Message(
                 sender_id=self.agent_id,
                 receiver_id=None,  # Broadcast
@@ -131,44 +226,147 @@ class Agent:
         return None
 
 
-class MultiAgentSystem:
-    """Orchestrates multiple autonomous agents"""
+class MessageBus:
+    """Topic-based message routing
+
+    Direct messages go straight to their receiver. Broadcasts are fanned out
+    only to agents subscribed to the message type, so delivery cost grows
+    with the number of interested agents rather than all agents.
+    """
+
+    def __init__(self):
+        self.queue: List[Message] = []
+        self.subscribers: Dict[str, Dict[int, Agent]] = {}  # type -> agent_id -> agent
+
+    def subscribe(self, agent: Agent, message_types: Tuple[str, ...]):
+        for message_type in message_types:
+            self.subscribers.setdefault(message_type, {})[agent.agent_id] = agent
+
+    def unsubscribe(self, agent: Agent, message_types: Tuple[str, ...]):
+        for message_type in message_types:
+            self.subscribers.get(message_type, {}).pop(agent.agent_id, None)
+
+    def publish(self, message: Message):
+        """Queue a message for the next delivery"""
+        self.queue.append(message)
+
+    def has_deliverable(self) -> bool:
+        """Whether delivering the queue would reach any agent"""
+        return any(message.receiver_id is not None or self.subscribers.get(message.message_type)
+                   for message in self.queue)
+
+    def deliver(self, agents: List[Agent], recipients: Optional[Set[int]] = None) -> int:
+        """Deliver all queued messages and return how many receipts were made
+
+        If `recipients` is given, the ids of agents that received mail are added to it.
+        """
+        delivered = 0
+
+        for message in self.queue:
+            if message.receiver_id is None:  # Broadcast
+                for agent_id, agent in self.subscribers.get(message.message_type, {}).items():
+                    if agent_id != message.sender_id:
+                        agent.receive_message(message)
+                        delivered += 1
+                        if recipients is not None:
+                            recipients.add(agent_id)
+            else:  # Direct message
+                agents[message.receiver_id].receive_message(message)
+                delivered += 1
+                if recipients is not None:
+                    recipients.add(message.receiver_id)
+
+        self.queue.clear()
+        return delivered
+
+
+class TaskStore:
+    """Tasks indexed by id and split by status
+
+    Open (unassigned), assigned and completed tasks live in separate
+    insertion-ordered dicts, so listing open tasks, moving a task between
+    states and looking one up by id never scan the other tasks.
+    """
+
+    def __init__(self):
+        self.open: Dict[int, Task] = {}
+        self.assigned: Dict[int, Task] = {}
+        self.completed: Dict[int, Task] = {}
+
+    def add(self, task: Task):
+        self.open[task.task_id] = task
+
+    def mark_assigned(self, task: Task):
+        if self.open.pop(task.task_id, None) is not None:
+            self.assigned[task.task_id] = task
+
+    def complete(self, task: Task):
+        """Move an open or assigned task to the completed set"""
+        if (self.assigned.pop(task.task_id, None) is not None
+                or self.open.pop(task.task_id, None) is not None):
+            self.completed[task.task_id] = task
+
+    def get(self, task_id: int) -> Optional[Task]:
+        """Look up a task by id, whatever its status"""
+        return (self.open.get(task_id) or self.assigned.get(task_id)
+                or self.completed.get(task_id))
+
+    @property
+    def n_active(self) -> int:
+        return len(self.open) + len(self.assigned)
+
+    def __len__(self) -> int:
+        return len(self.open) + len(self.assigned) + len(self.completed)
+
+
+class AgentPool:
+    """Set of agents with O(1) add, remove and random choice"""
 
     def __init__(self):
         self.agents: List[Agent] = []
-        self.tasks: List[Task] = []
-        self.completed_tasks: List[Task] = []
-        self.timestep = 0
-        self.message_queue: List[Message] = []
+        self.positions: Dict[int, int] = {}  # agent_id -> index in self.agents
 
-    def add_agent(self, role: AgentRole, capabilities: List[str]) -> Agent:
-        """Add a new agent to the system"""
-        agent_id = len(self.agents)
-        agent = Agent(agent_id, role, capabilities)
-        self.agents.append(agent)
-        return agent
+    def add(self, agent: Agent):
+        if agent.agent_id not in self.positions:
+            self.positions[agent.agent_id] = len(self.agents)
+            self.agents.append(agent)
 
-    def add_task(self, complexity: float, requirements: List[AgentRole]) -> Task:
-        """Add a new task to the system"""
-        task_id = len(self.tasks) + len(self.completed_tasks)
-        task = Task(task_id, complexity, requirements)
-        self.tasks.append(task)
-        return task
+    def remove(self, agent: Agent):
+        index = self.positions.pop(agent.agent_id, None)
+        if index is None:
+            return
 
-    def assign_tasks(self):
-        """Intelligent task assignment based on agent roles"""
-        unassigned_tasks = [t for t in self.tasks if not t.assigned_agents]
+        # Move the last agent into the freed slot
+        last = self.agents.pop()
+        if last is not agent:
+            self.agents[index] = last
+            self.positions[last.agent_id] = index
+
+    def __contains__(self, agent: Agent) -> bool:
+        return agent.agent_id in self.positions
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
+
+class RandomAssignment:
+    """Default strategy: open tasks in order, a random idle agent per required role
 
-        for task in unassigned_tasks:
+    Agents are not reserved, so one agent can be picked for several tasks
+    in the same step; it keeps the last assignment it processes.
+    """
+
+    def assign(self, system: 'MultiAgentSystem') -> List[Tuple[Task, List[Agent]]]:
+        """Return (task, team) pairs to assign this step"""
+        matches = []
+
+        for task in system.task_store.open.values():
             # Find suitable agents for each required role
             assigned_agents = []
 
             for required_role in task.requirements:
-                # Find available agent with this role
-                available_agents = [
-                    agent for agent in self.agents
-                    if agent.role == required_role and agent.current_task is None
-                ]
+                # Pick an available agent with this role
+                available_agents = system.idle_pools[required_role].agents
 
                 if available_agents:
                     selected_agent = random.choice(available_agents)
@@ -176,69 +374,1448 @@ class MultiAgentSystem:
 
             # Assign task if all roles can be filled
             if len(assigned_agents) == len(task.requirements):
-                task.assigned_agents = assigned_agents
-
-                for agent in assigned_agents:
-                    message = Message(
-                        sender_id=-1,  # System message
-                        receiver_id=agent.agent_id,
-                        message_type="task_assignment",
-                        content={"task": task}
-                    )
-                    self.message_queue.append(message)
+                matches.append((task, assigned_agents))
 
-    def deliver_messages(self):
-        """Deliver messages to agents"""
-        for message in self.message_queue:
-            if message.receiver_id is None:  # Broadcast
-                for agent in self.agents:
-                    if agent.agent_id != message.sender_id:
-                        agent.receive_message(message)
-            else:  # Direct message
-                self.agents[message.receiver_id].receive_message(message)
+        return matches
 
-        self.message_queue.clear()
+    def get_state(self) -> Dict:
+        """State saved with checkpoints"""
+        return {}
+
+    def set_state(self, state: Dict):
+        pass
+
+
+class MatchingAssignment:
+    """Batch assignment that staffs whole tasks and spends scarce roles carefully
+
+    Open tasks are ranked by the scarce-agent time they would use: their
+    expected duration times the demand/supply ratio of each required role.
+    Cheaper tasks are staffed first, and a task only takes agents if all
+    of its roles can be filled, so agents are reserved rather than spread
+    over tasks that cannot start. A task's cost is halved once it has
+    existed for `aging` steps (and keeps shrinking), so large tasks are
+    not starved.
+    Within a role the best-performing idle agents go first. The cost is
+    O(open tasks + idle agents log idle agents) per step.
+    """
+
+    def __init__(self, aging: float = 20.0):
+        self.aging = aging
+
+    def assign(self, system: 'MultiAgentSystem') -> List[Tuple[Task, List[Agent]]]:
+        """Return (task, team) pairs to assign this step"""
+        open_tasks = list(system.task_store.open.values())
+        if not open_tasks:
+            return []
+
+        # Idle agents per role, best performers first
+        idle = {role: sorted(pool.agents, key=lambda agent: -agent.performance_score)
+                for role, pool in system.idle_pools.items()}
+        supply = {role: len(agents) for role, agents in idle.items()}
+        demand = dict.fromkeys(idle, 0)
+        for task in open_tasks:
+            for role in task.requirements:
+                demand[role] += 1
+        scarcity = {role: demand[role] / max(supply[role], 1) for role in idle}
+
+        costs = np.empty(len(open_tasks))
+        for i, task in enumerate(open_tasks):
+            waited = system.timestep - task.created_at
+            # A full team finishes in about 10 * complexity / team size steps
+            duration = 10 * task.complexity / max(len(task.requirements), 1)
+            cost = duration * sum(scarcity[role] for role in task.requirements)
+            costs[i] = cost / (1 + waited / self.aging)
+
+        taken = dict.fromkeys(idle, 0)
+        matches = []
+        for i in np.argsort(costs, kind='stable'):
+            task = open_tasks[i]
+            needed: Dict[AgentRole, int] = {}
+            for role in task.requirements:
+                needed[role] = needed.get(role, 0) + 1
+            if any(taken[role] + count > supply[role] for role, count in needed.items()):
+                continue
+
+            team = []
+            for role in task.requirements:
+                team.append(idle[role][taken[role]])
+                taken[role] += 1
+            matches.append((task, team))
+
+        return matches
+
+    def get_state(self) -> Dict:
+        """State saved with checkpoints"""
+        return {'aging': self.aging}
+
+    def set_state(self, state: Dict):
+        self.aging = state['aging']
+
+
+# Strategies restore() can rebuild from a checkpoint by name
+ASSIGNMENT_STRATEGIES = {strategy.__name__: strategy
+                         for strategy in (RandomAssignment, MatchingAssignment)}
+
+
+class StepProfiler:
+    """Per-phase timers, message counters and latency histograms for step()
+
+    Attach one with MultiAgentSystem(profiler=StepProfiler()). Each phase
+    of a step is timed into a power-of-two histogram of microseconds
+    (bucket k counts durations below 2**k us). With `trace`, every step is
+    also kept as a record that can be exported as JSON lines or as a
+    Chrome trace (chrome://tracing, Perfetto); `max_trace_steps` keeps
+    only the most recent ones. Ticks jumped over by event-driven runs are
+    not recorded.
+    """
+
+    PHASES = ('assign_tasks', 'deliver_messages', 'process_messages', 'agent_actions', 'reap')
+
+    def __init__(self, trace: bool = True, max_trace_steps: Optional[int] = None):
+        self.steps = 0
+        self.totals: Dict[str, float] = dict.fromkeys(self.PHASES, 0.0)
+        self.histograms: Dict[str, List[int]] = {phase: [] for phase in self.PHASES}
+        self.counters: Dict[str, int] = {}
+        self.max_counters: Dict[str, int] = {}
+        self.trace = deque(maxlen=max_trace_steps) if trace else None
+        self._origin = time.perf_counter()
+        self._current: Optional[Dict] = None
+
+    def begin_step(self, timestep: int) -> float:
+        """Start timing a step and return the start time for the first lap()"""
+        now = time.perf_counter()
+        self._current = {'timestep': timestep, 'start': now - self._origin,
+                         'phases': {}, 'counters': {}}
+        return now
+
+    def lap(self, phase: str, start: float) -> float:
+        """Record `phase` as running from `start` until now, and return now"""
+        now = time.perf_counter()
+        elapsed = now - start
+        self.totals[phase] += elapsed
+        self._current['phases'][phase] = elapsed
+
+        bucket = int(elapsed * 1e6).bit_length()
+        histogram = self.histograms[phase]
+        if bucket >= len(histogram):
+            histogram.extend([0] * (bucket + 1 - len(histogram)))
+        histogram[bucket] += 1
+        return now
+
+    def count(self, name: str, value: int):
+        """Add `value` to a counter; per-step maxima are kept as well"""
+        self.counters[name] = self.counters.get(name, 0) + value
+        self.max_counters[name] = max(self.max_counters.get(name, 0), value)
+        self._current['counters'][name] = value
+
+    def end_step(self):
+        self.steps += 1
+        if self.trace is not None:
+            self.trace.append(self._current)
+        self._current = None
+
+    def percentile(self, phase: str, q: float) -> float:
+        """Upper bound in seconds of the histogram bucket holding the q-th percentile"""
+        histogram = self.histograms[phase]
+        target = q / 100 * sum(histogram)
+        seen = 0
+        for bucket, n in enumerate(histogram):
+            seen += n
+            if n and seen >= target:
+                return 2 ** bucket / 1e6
+        return 0.0
+
+    def summary(self) -> Dict:
+        """Totals, means and percentiles per phase, plus counters"""
+        phases = {}
+        for phase in self.PHASES:
+            phases[phase] = {
+                'total': self.totals[phase],
+                'mean': self.totals[phase] / self.steps if self.steps else 0.0,
+                'p50': self.percentile(phase, 50),
+                'p99': self.percentile(phase, 99),
+            }
+        return {'steps': self.steps, 'phases': phases,
+                'counters': dict(self.counters), 'max_per_step': dict(self.max_counters)}
+
+    def write_jsonl(self, file):
+        """Write the trace as one JSON object per step"""
+        with open(file, 'w') as f:
+            for record in self.trace or ():
+                f.write(json.dumps(record) + '\n')
+
+    def write_chrome_trace(self, file):
+        """Write the trace in Chrome trace event format, one slice per phase"""
+        events = []
+        for record in self.trace or ():
+            start = record['start'] * 1e6
+            duration = sum(record['phases'].values()) * 1e6
+            events.append({'name': f"step {record['timestep']}", 'ph': 'X', 'pid': 0, 'tid': 0,
+                           'ts': start, 'dur': duration, 'args': record['counters']})
+            for phase, elapsed in record['phases'].items():
+                events.append({'name': phase, 'ph': 'X', 'pid': 0, 'tid': 0,
+                               'ts': start, 'dur': elapsed * 1e6})
+                start += elapsed * 1e6
+
+        with open(file, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+# Bump when the checkpoint layout changes; restore() rejects other versions
+CHECKPOINT_VERSION = 1
+
+
+def _flatten(lists: List[List[int]], dtype) -> Tuple[np.ndarray, np.ndarray]:
+    """Ragged lists as one value array plus offsets (list i is values[offsets[i]:offsets[i + 1]])"""
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(values) for values in lists])
+    values = np.fromiter((value for values in lists for value in values), dtype=dtype,
+                         count=int(offsets[-1]))
+    return values, offsets
+
+
+def _unflatten(values: np.ndarray, offsets: np.ndarray) -> List[List[int]]:
+    values, offsets = values.tolist(), offsets.tolist()
+    return [values[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def _has_string_keys(value) -> bool:
+    """Whether every dict inside `value` has str keys, which JSON keeps as they are"""
+    if isinstance(value, dict):
+        return all(isinstance(key, str) and _has_string_keys(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return all(_has_string_keys(item) for item in value)
+    return True
+
+
+def _encode_message(message: Message, mailbox: Optional[int] = None) -> List:
+    """JSON-ready message, with Task references replaced by their ids"""
+    content = {key: {"__task__": value.task_id} if isinstance(value, Task) else value
+               for key, value in message.content.items()}
+    if not _has_string_keys(content):
+        raise ValueError(f"Cannot checkpoint {message.message_type} message from agent "
+                         f"{message.sender_id}: JSON would turn its non-string keys into strings")
+    return [message.sender_id, message.receiver_id, message.message_type, content, mailbox]
+
+
+def _decode_message(encoded: List, tasks: List[Task]) -> Message:
+    sender_id, receiver_id, message_type, content, _ = encoded
+    content = {key: tasks[value["__task__"]] if isinstance(value, dict) and "__task__" in value
+               else value
+               for key, value in content.items()}
+    return Message(sender_id, receiver_id, message_type, content)
+
+
+class MultiAgentSystem:
+    """Orchestrates multiple autonomous agents"""
+
+    def __init__(self, check_statistics: bool = False, assignment=None,
+                 profiler: Optional[StepProfiler] = None,
+                 blackboard: Optional[Blackboard] = None):
+        self.agents: List[Agent] = []
+        self.task_store = TaskStore()
+        self.timestep = 0
+        self.bus = MessageBus()
+        self.message_queue: List[Message] = self.bus.queue
+
+        # Idle agents per role and busy agents, kept up to date as agents change state
+        self.idle_pools: Dict[AgentRole, AgentPool] = {role: AgentPool() for role in AgentRole}
+        self.busy_pool = AgentPool()
+
+        # Running total for get_statistics(); with check_statistics every call
+        # is verified against a full scan of the agents
+        self.total_performance = 0.0
+        self.check_statistics = check_statistics
+
+        # Strategy that picks which tasks are staffed by which idle agents
+        self.assignment = assignment if assignment is not None else RandomAssignment()
+        self.profiler = profiler  # Per-phase timings of step() when set
+        self.blackboard = blackboard  # Shared knowledge for all agents when set
+
+    def add_agent(self, role: AgentRole, capabilities: List[str]) -> Agent:
+        """Add a new agent to the system"""
+        agent_id = len(self.agents)
+        agent = Agent(agent_id, role, capabilities)
+        self.agents.append(agent)
+
+        agent.observer = self
+        agent.blackboard = self.blackboard
+        self.total_performance += agent.performance_score
+        self.bus.subscribe(agent, agent.SUBSCRIPTIONS)
+        if agent.current_task is None:
+            self.idle_pools[role].add(agent)
+        return agent
+
+    def on_agent_idle_changed(self, agent: Agent, idle: bool):
+        """Keep the role pools in sync when an agent starts or finishes a task"""
+        if idle:
+            self.idle_pools[agent.role].add(agent)
+            self.busy_pool.remove(agent)
+        else:
+            self.idle_pools[agent.role].remove(agent)
+            self.busy_pool.add(agent)
+
+    def on_agent_performance_changed(self, agent: Agent, delta: float):
+        self.total_performance += delta
+
+    @property
+    def tasks(self) -> List[Task]:
+        """Active (open and assigned) tasks in id order"""
+        return sorted([*self.task_store.open.values(), *self.task_store.assigned.values()],
+                      key=lambda task: task.task_id)
+
+    @property
+    def completed_tasks(self) -> List[Task]:
+        """Completed tasks in completion order"""
+        return list(self.task_store.completed.values())
+
+    def add_task(self, complexity: float, requirements: List[AgentRole]) -> Task:
+        """Add a new task to the system"""
+        task_id = len(self.task_store)
+        task = Task(task_id, complexity, requirements)
+        task.created_at = self.timestep
+        self.task_store.add(task)
+        return task
+
+    def assign_tasks(self):
+        """Assign open tasks to idle agents chosen by the assignment strategy"""
+        for task, assigned_agents in self.assignment.assign(self):
+            task.assigned_agents = assigned_agents
+            self.task_store.mark_assigned(task)
+
+            for agent in assigned_agents:
+                message = Message(
+                    sender_id=-1,  # System message
+                    receiver_id=agent.agent_id,
+                    message_type="task_assignment",
+                    content={"task": task}
+                )
+                self.message_queue.append(message)
+
+    def deliver_messages(self, recipients: Optional[Set[int]] = None) -> int:
+        """Deliver messages to agents and return how many receipts were made"""
+        return self.bus.deliver(self.agents, recipients)
 
     def step(self):
         """Execute one timestep of the simulation"""
+        self._step(active_only=False)
+
+    def _step(self, active_only: bool):
+        """One timestep; with `active_only`, idle agents without mail are skipped
+
+        Skipping them does not change the outcome: an idle agent with no
+        messages decides "idle" and does nothing.
+        """
         self.timestep += 1
+        profiler = self.profiler
+        if profiler is not None:
+            lap = profiler.begin_step(self.timestep)
 
         # Assign new tasks
         self.assign_tasks()
 
+        if profiler is not None:
+            lap = profiler.lap('assign_tasks', lap)
+            profiler.count('messages_queued', len(self.message_queue))
+
         # Deliver pending messages
-        self.deliver_messages()
+        if active_only:
+            recipients = set()
+            delivered = self.deliver_messages(recipients)
+            recipients.update(self.busy_pool.positions)
+            agents = [self.agents[agent_id] for agent_id in sorted(recipients)]
+        else:
+            delivered = self.deliver_messages()
+            agents = self.agents
+
+        if profiler is not None:
+            lap = profiler.lap('deliver_messages', lap)
+            profiler.count('messages_delivered', delivered)
 
         # Each agent processes messages
-        for agent in self.agents:
+        for agent in agents:
             agent.process_messages()
 
+        if profiler is not None:
+            lap = profiler.lap('process_messages', lap)
+
         # Each agent decides and executes action
-        for agent in self.agents:
+        completed_this_step = []
+        for agent in agents:
             action = agent.decide_action()
             message = agent.execute_action(action)
 
             if message:
                 self.message_queue.append(message)
+                if message.message_type == "task_completed":
+                    completed_this_step.append(message.content["task_id"])
+
+        if profiler is not None:
+            lap = profiler.lap('agent_actions', lap)
+            profiler.count('messages_sent', len(self.message_queue))
+
+        # Move completed tasks out of the active set
+        for task_id in sorted(completed_this_step):
+            self.task_store.complete(self.task_store.get(task_id))
+
+        if profiler is not None:
+            profiler.lap('reap', lap)
+            profiler.count('tasks_completed', len(completed_this_step))
+            profiler.end_step()
+
+    def run(self, n_steps: int, event_driven: bool = False) -> Dict:
+        """Advance the simulation by `n_steps` timesteps and return the statistics
+
+        With `event_driven`, only agents with work or mail are visited, and
+        stretches of ticks where nothing but task progress can happen are
+        jumped over in one go. The result matches calling step() `n_steps`
+        times, including the random choices made during assignment.
+        """
+        end = self.timestep + n_steps
+
+        while self.timestep < end:
+            if not event_driven:
+                self.step()
+                continue
+
+            quiet_ticks = self._quiet_ticks()
+            if quiet_ticks is None:
+                # Nobody is working and nothing can be assigned
+                self.timestep = end
+                break
+
+            jump = min(quiet_ticks, end - self.timestep)
+            if jump > 0:
+                self._fast_forward(jump)
+            if self.timestep < end:
+                self._step(active_only=True)
+
+        return self.get_statistics()
+
+    def _workers_by_task(self) -> Dict[int, Tuple[Task, List[Agent]]]:
+        """Busy agents grouped by the task they work on, in agent id order"""
+        groups: Dict[int, Tuple[Task, List[Agent]]] = {}
+        for agent_id in sorted(self.busy_pool.positions):
+            agent = self.agents[agent_id]
+            task = agent.current_task
+            groups.setdefault(id(task), (task, []))[1].append(agent)
+        return groups
+
+    def _quiet_ticks(self) -> Optional[int]:
+        """Number of upcoming ticks in which only task progress can change
+
+        Returns 0 when the next tick needs to run in full (messages to
+        deliver, assignment would draw random numbers, or a task completed),
+        and None when no upcoming tick can change anything.
+        """
+        if self.bus.has_deliverable():
+            return 0
+
+        # assign_tasks draws a random agent whenever any required role has an idle agent
+        for task in self.task_store.open.values():
+            if any(self.idle_pools[role] for role in task.requirements):
+                return 0
+
+        if not self.busy_pool:
+            return None
+
+        quiet = None
+        for task, workers in self._workers_by_task().values():
+            if task.completed:
+                return 0  # Its agents go idle on the next tick
+
+            step = task.progress_step() if task.can_be_completed() else 0.0
+            if step <= 0:
+                continue
+
+            # Replay the per-agent additions to find the tick in which the task completes
+            progress, ticks = task.progress, 0
+            while progress < 1.0:
+                for _ in workers:
+                    progress = min(1.0, progress + step)
+                ticks += 1
+            quiet = ticks - 1 if quiet is None else min(quiet, ticks - 1)
+
+        return quiet
+
+    def _fast_forward(self, n_ticks: int):
+        """Apply `n_ticks` ticks in which every busy agent just works on its task
+
+        The additions are replayed in the same order as step() would make
+        them, so progress, scores and the running performance total match
+        tick-by-tick execution exactly.
+        """
+        steps: Dict[int, float] = {}
+        for task, workers in self._workers_by_task().values():
+            step = task.progress_step() if task.can_be_completed() else 0.0
+            progress = task.progress
+            for _ in range(n_ticks * len(workers)):
+                progress = min(1.0, progress + step)
+            task.progress = progress
+
+            for agent in workers:
+                steps[agent.agent_id] = step
+
+        # Within a tick, step() credits busy agents in id order
+        workers = [self.agents[agent_id] for agent_id in sorted(steps)]
+        worker_steps = [steps[agent.agent_id] for agent in workers]
+        scores = [agent.performance_score for agent in workers]
+        total = self.total_performance
+
+        for _ in range(n_ticks):
+            for i, step in enumerate(worker_steps):
+                score = scores[i] + step
+                total += score - scores[i]
+                scores[i] = score
+
+        # The total was already updated above, so bypass the observer
+        for agent, score in zip(workers, scores):
+            agent._performance_score = score
+        self.total_performance = total
+        self.timestep += n_ticks
+
+    def checkpoint(self, file, compress: bool = False):
+        """Save the whole simulation to a versioned .npz checkpoint
+
+        Agents, tasks, agent pools and subscriptions are stored as flat
+        NumPy arrays with ids in place of object references. Capabilities,
+        knowledge, blackboard and queued messages go into a JSON metadata
+        record, so knowledge and message contents other than tasks must be
+        JSON-serializable, and a ValueError is raised for dict keys that are
+        not strings. The random and np.random states are included,
+        so a restored run continues exactly like the original. So is the
+        assignment strategy's type and, if it has get_state(), its state.
+        """
+        for agent in self.agents:
+            if not _has_string_keys(agent.knowledge):
+                raise ValueError(f"Cannot checkpoint agent {agent.agent_id}: JSON would turn "
+                                 f"its non-string knowledge keys into strings")
+        if self.blackboard is not None and not _has_string_keys(self.blackboard.facts):
+            raise ValueError("Cannot checkpoint the blackboard: JSON would turn its "
+                             "non-string keys into strings")
+
+        roles = list(AgentRole)
+        role_index = {role: i for i, role in enumerate(roles)}
+        store = self.task_store
+        by_id = {**store.open, **store.assigned, **store.completed}
+        tasks = [by_id[task_id] for task_id in range(len(by_id))]
+
+        # Agents share a handful of capability lists; store each distinct one once
+        capability_table: Dict[Tuple[str, ...], int] = {}
+        agent_capabilities = np.fromiter(
+            (capability_table.setdefault(tuple(agent.capabilities), len(capability_table))
+             for agent in self.agents), dtype=np.int32, count=len(self.agents))
+
+        messages = [_encode_message(message) for message in self.message_queue]
+        for agent in self.agents:
+            messages.extend(_encode_message(message, agent.agent_id) for message in agent.messages)
+
+        requirements, requirement_offsets = _flatten(
+            [[role_index[role] for role in task.requirements] for task in tasks], np.int8)
+        teams, team_offsets = _flatten(
+            [[agent.agent_id for agent in task.assigned_agents] for task in tasks], np.int64)
+        idle_pools, idle_pool_offsets = _flatten(
+            [list(self.idle_pools[role].positions) for role in roles], np.int64)
+        subscription_types = list(self.bus.subscribers)
+        subscriptions, subscription_offsets = _flatten(
+            [list(self.bus.subscribers[message_type]) for message_type in subscription_types], np.int64)
+
+        py_version, py_state, py_gauss = random.getstate()
+        _, np_keys, np_pos, np_has_gauss, np_gauss = np.random.get_state()
+
+        metadata = {
+            'version': CHECKPOINT_VERSION,
+            'timestep': self.timestep,
+            'total_performance': self.total_performance,
+            'roles': [role.name for role in roles],
+            'capabilities': [list(capabilities) for capabilities in capability_table],
+            'knowledge': {agent.agent_id: agent.knowledge for agent in self.agents if agent.knowledge},
+            'messages': messages,
+            'blackboard': (None if self.blackboard is None else
+                           [self.blackboard.facts, self.blackboard._changelog]),
+            'subscription_types': subscription_types,
+            'random': [py_version, py_gauss],
+            'np_random': [int(np_pos), int(np_has_gauss), float(np_gauss)],
+            'assignment': [type(self.assignment).__name__,
+                           self.assignment.get_state() if hasattr(self.assignment, 'get_state') else None],
+        }
 
-        # Check for completed tasks
-        completed_this_step = [t for t in self.tasks if t.completed]
-        for task in completed_this_step:
-            self.tasks.remove(task)
-            self.completed_tasks.append(task)
+        save = np.savez_compressed if compress else np.savez
+        save(
+            file,
+            metadata=np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8),
+            agent_roles=np.fromiter((role_index[agent.role] for agent in self.agents),
+                                    dtype=np.int8, count=len(self.agents)),
+            agent_capabilities=agent_capabilities,
+            agent_tasks=np.fromiter(
+                (-1 if agent.current_task is None else agent.current_task.task_id
+                 for agent in self.agents), dtype=np.int64, count=len(self.agents)),
+            agent_scores=np.fromiter((agent.performance_score for agent in self.agents),
+                                     dtype=np.float64, count=len(self.agents)),
+            task_complexity=np.array([task.complexity for task in tasks], dtype=np.float64),
+            task_progress=np.array([task.progress for task in tasks], dtype=np.float64),
+            task_created=np.array([task.created_at for task in tasks], dtype=np.int64),
+            task_completed=np.array([task.completed for task in tasks], dtype=bool),
+            task_requirements=requirements,
+            task_requirement_offsets=requirement_offsets,
+            task_teams=teams,
+            task_team_offsets=team_offsets,
+            open_tasks=np.array(list(store.open), dtype=np.int64),
+            assigned_tasks=np.array(list(store.assigned), dtype=np.int64),
+            completed_tasks=np.array(list(store.completed), dtype=np.int64),
+            idle_pools=idle_pools,
+            idle_pool_offsets=idle_pool_offsets,
+            busy_pool=np.array(list(self.busy_pool.positions), dtype=np.int64),
+            subscriptions=subscriptions,
+            subscription_offsets=subscription_offsets,
+            random_state=np.array(py_state, dtype=np.uint32),
+            np_random_keys=np_keys,
+        )
+
+    @classmethod
+    def restore(cls, file, check_statistics: bool = False, assignment=None) -> 'MultiAgentSystem':
+        """Rebuild a system from checkpoint() output and reset random and np.random to its state
+
+        Without `assignment`, the saved strategy is rebuilt; strategies
+        outside ASSIGNMENT_STRATEGIES must be passed in. A passed strategy
+        of the saved type gets the saved state.
+        """
+        with np.load(file) as data:
+            metadata = json.loads(data['metadata'].tobytes().decode())
+            if metadata['version'] != CHECKPOINT_VERSION:
+                raise ValueError(f"Unsupported checkpoint version {metadata['version']} "
+                                 f"(expected {CHECKPOINT_VERSION})")
+            arrays = {key: data[key] for key in data.files if key != 'metadata'}
+
+        roles = [AgentRole[name] for name in metadata['roles']]
+        strategy, strategy_state = metadata.get('assignment', ['RandomAssignment', None])
+        if assignment is None:
+            if strategy not in ASSIGNMENT_STRATEGIES:
+                raise ValueError(f"Checkpoint uses assignment strategy {strategy}; "
+                                 f"pass an instance as assignment=")
+            assignment = ASSIGNMENT_STRATEGIES[strategy]()
+        if strategy_state is not None and type(assignment).__name__ == strategy:
+            assignment.set_state(strategy_state)
+
+        system = cls(check_statistics=check_statistics, assignment=assignment)
+        if metadata.get('blackboard') is not None:
+            system.blackboard = Blackboard()
+            system.blackboard.facts, system.blackboard._changelog = metadata['blackboard']
+            system.blackboard.version = len(system.blackboard._changelog)
+
+        # Tasks
+        tasks = []
+        requirements = _unflatten(arrays['task_requirements'], arrays['task_requirement_offsets'])
+        created = arrays.get('task_created', np.zeros(len(arrays['task_complexity']), dtype=np.int64))
+        for task_id, (complexity, progress, completed, created_at) in enumerate(zip(
+                arrays['task_complexity'].tolist(), arrays['task_progress'].tolist(),
+                arrays['task_completed'].tolist(), created.tolist())):
+            task = Task(task_id, complexity, [roles[role] for role in requirements[task_id]])
+            task.progress = progress
+            task.completed = completed
+            task.created_at = created_at
+            tasks.append(task)
+
+        # Agents; state is set on the backing fields since the counters are restored as saved
+        capabilities = metadata['capabilities']
+        knowledge = metadata['knowledge']
+        for agent_id, (role, capability, task_id, score) in enumerate(zip(
+                arrays['agent_roles'].tolist(), arrays['agent_capabilities'].tolist(),
+                arrays['agent_tasks'].tolist(), arrays['agent_scores'].tolist())):
+            agent = Agent(agent_id, roles[role], list(capabilities[capability]))
+            agent._current_task = tasks[task_id] if task_id >= 0 else None
+            agent._performance_score = score
+            agent.knowledge = knowledge.get(str(agent_id), {})
+            agent.blackboard = system.blackboard
+            agent.observer = system
+            system.agents.append(agent)
+
+        agents = system.agents
+        for task, team in zip(tasks, _unflatten(arrays['task_teams'], arrays['task_team_offsets'])):
+            task.assigned_agents = [agents[agent_id] for agent_id in team]
+
+        store = system.task_store
+        store.open = {task_id: tasks[task_id] for task_id in arrays['open_tasks'].tolist()}
+        store.assigned = {task_id: tasks[task_id] for task_id in arrays['assigned_tasks'].tolist()}
+        store.completed = {task_id: tasks[task_id] for task_id in arrays['completed_tasks'].tolist()}
+
+        # Pool order matters: assignment draws agents by position
+        pools = [system.idle_pools[role] for role in roles] + [system.busy_pool]
+        members = _unflatten(arrays['idle_pools'], arrays['idle_pool_offsets'])
+        members.append(arrays['busy_pool'].tolist())
+        for pool, agent_ids in zip(pools, members):
+            pool.agents = [agents[agent_id] for agent_id in agent_ids]
+            pool.positions = {agent_id: index for index, agent_id in enumerate(agent_ids)}
+
+        for message_type, agent_ids in zip(
+                metadata['subscription_types'],
+                _unflatten(arrays['subscriptions'], arrays['subscription_offsets'])):
+            system.bus.subscribers[message_type] = {agent_id: agents[agent_id] for agent_id in agent_ids}
+
+        for encoded in metadata['messages']:
+            message = _decode_message(encoded, tasks)
+            mailbox = encoded[4]
+            if mailbox is None:
+                system.message_queue.append(message)
+            else:
+                agents[mailbox].messages.append(message)
+
+        system.timestep = metadata['timestep']
+        system.total_performance = metadata['total_performance']
+
+        py_version, py_gauss = metadata['random']
+        random.setstate((py_version, tuple(arrays['random_state'].tolist()), py_gauss))
+        np_pos, np_has_gauss, np_gauss = metadata['np_random']
+        np.random.set_state(('MT19937', arrays['np_random_keys'], np_pos, np_has_gauss, np_gauss))
+
+        return system
 
     def get_statistics(self) -> Dict:
-        """Get system statistics"""
-        return {
+        """Get system statistics in O(1) from incrementally maintained counters"""
+        busy = len(self.busy_pool)
+        stats = {
             'timestep': self.timestep,
             'total_agents': len(self.agents),
-            'active_tasks': len(self.tasks),
-            'completed_tasks': len(self.completed_tasks),
+            'active_tasks': self.task_store.n_active,
+            'completed_tasks': len(self.task_store.completed),
+            'idle_agents': len(self.agents) - busy,
+            'busy_agents': busy,
+            'avg_performance': self.total_performance / len(self.agents) if self.agents else 0,
+        }
+
+        if self.check_statistics:
+            self._verify_statistics(stats)
+        return stats
+
+    def _verify_statistics(self, stats: Dict):
+        """Compare counter-based statistics with a full scan of the agents"""
+        scanned = {
             'idle_agents': sum(1 for a in self.agents if a.current_task is None),
             'busy_agents': sum(1 for a in self.agents if a.current_task is not None),
             'avg_performance': np.mean([a.performance_score for a in self.agents]) if self.agents else 0,
         }
 
+        for key, expected in scanned.items():
+            if not np.isclose(stats[key], expected, rtol=1e-9, atol=1e-12):
+                raise RuntimeError(f"Statistic '{key}' drifted: counter {stats[key]}, scan {expected}")
+
+
+def _replay_work(task: Task, n_steps: int, progress_step: float):
+    """Apply `n_steps` work steps of agents in other shards, as Task.execute_step would
+
+    `progress_step` is the task's progress_step(), or 0 if it cannot be completed.
+    """
+    if task.completed or not progress_step:
+        return
+
+    for _ in range(n_steps):
+        task.progress = min(1.0, task.progress + progress_step)
+        if task.progress >= 1.0:
+            task.completed = True
+            return
+
+
+def _shard_worker(conn):
+    """Runs one shard of a ShardedMultiAgentSystem's agents, driven over a pipe"""
+    agents: Dict[int, Agent] = {}
+    bus = MessageBus()
+    replicas: Dict[int, Task] = {}  # Local copies of the tasks this shard's agents work on
+    holders: Dict[int, List[int]] = {}  # task_id -> ids of every agent on it, in all shards
+    progress_steps: Dict[int, float] = {}  # task_id -> progress per work step, fixed once assigned
+
+    while True:
+        command = conn.recv()
+        if command[0] == 'stop':
+            break
+
+        if command[0] == 'add_agent':
+            _, agent_id, role, capabilities = command
+            agent = Agent(agent_id, role, capabilities)
+            agents[agent_id] = agent
+            bus.subscribe(agent, agent.SUBSCRIPTIONS)
+
+        elif command[0] == 'step':
+            _, messages = command
+
+            # Assignments arrive as task specs; agents of a task share one replica
+            for message in messages:
+                if message.message_type == "task_assignment":
+                    spec = message.content
+                    task = replicas.get(spec["task_id"])
+                    if task is None:
+                        task = Task(spec["task_id"], spec["complexity"], spec["requirements"])
+                        task.assigned_agents = [Agent(agent_id, role, [])
+                                                for agent_id, role in spec["team"]]
+                        replicas[task.task_id] = task
+                        holders[task.task_id] = spec["holders"]
+                        progress_steps[task.task_id] = (task.progress_step() if task.can_be_completed()
+                                                        else 0.0)
+                    message.content = {"task": task}
+                bus.publish(message)
+
+            recipients = set()
+            bus.deliver(agents, recipients)
+            for agent_id in sorted(recipients):
+                agents[agent_id].process_messages()
+
+            # Work on a task always comes from all of its holders in id order until it
+            # completes, so every shard replays the other shards' steps on its replica
+            # and reaches the same progress without asking the parent
+            finished, worked, deltas, outgoing = [], [], [], []
+            for task_id in list(replicas):
+                task = replicas[task_id]
+                holding = 0
+                others = 0  # Work steps of other shards' agents not yet replayed
+                for agent_id in holders[task_id]:
+                    agent = agents.get(agent_id)
+                    if agent is None:
+                        others += 1
+                        continue
+                    if others:
+                        _replay_work(task, others, progress_steps[task_id])
+                        others = 0
+                    if agent.current_task is not task:
+                        continue
+
+                    if agent.decide_action() == "task_completed":
+                        finished.append(agent_id)
+                        continue
+                    holding += 1
+                    before = agent.performance_score
+                    message = agent.execute_action("work_on_task")
+                    worked.append(agent_id)
+                    deltas.append(agent.performance_score - before)
+                    if message:
+                        outgoing.append(message)
+
+                if others:
+                    _replay_work(task, others, progress_steps[task_id])
+                if not holding:
+                    del replicas[task_id], holders[task_id], progress_steps[task_id]
+
+            worked = np.array(worked, dtype=np.int64)
+            order = np.argsort(worked, kind='stable')
+            scores = np.array([agents[agent_id].performance_score for agent_id in worked.tolist()])
+            outgoing.sort(key=lambda message: message.sender_id)
+            conn.send((sorted(finished), worked[order], np.array(deltas)[order].reshape(-1),
+                       scores[order].reshape(-1), outgoing))
+
+        elif command[0] == 'agents':
+            conn.send(([agents[agent_id] for agent_id in sorted(agents)],
+                       {task_id: task.progress for task_id, task in replicas.items()}))
+
+    conn.close()
+
+
+class ShardedMultiAgentSystem(MultiAgentSystem):
+    """MultiAgentSystem whose agents are split across worker processes
+
+    Agent i lives in shard i % n_shards. Each worker delivers mail to its
+    agents and runs process_messages, decide_action and execute_action for
+    them, while the parent routes messages between shards (direct messages
+    to the receiver's shard, broadcasts to every shard) and owns the tasks,
+    task assignment and the random number generator. With the same seed a
+    run matches MultiAgentSystem step for step.
+
+    Task progress is owned by the workers. Once assigned, every agent on a
+    task works on it each step, in id order, until it completes, so a shard
+    whose agents share a task with other shards replays their work steps on
+    its replica instead of waiting for them. Each step is therefore one
+    round trip per shard, and the parent does no per-agent work beyond
+    copying back the scores of agents that worked.
+
+    `self.agents` are mirrors in the parent that track role, current task
+    and performance score for assignment and statistics; fetch_agents()
+    returns copies of the workers' agents, including messages and knowledge.
+    The parent's copies of tasks in progress only catch up on progress in
+    fetch_agents(). Message contents other than task assignments must be
+    picklable, and assignment strategies must only pick idle agents.
+    """
+
+    def __init__(self, n_shards: int = 4, check_statistics: bool = False, assignment=None):
+        super().__init__(check_statistics, assignment)
+        self.n_shards = n_shards
+        self.connections = []
+        self.processes = []
+
+        for _ in range(n_shards):
+            parent_conn, child_conn = mp.Pipe()
+            process = mp.Process(target=_shard_worker, args=(child_conn,), daemon=True)
+            process.start()
+            child_conn.close()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+    def add_agent(self, role: AgentRole, capabilities: List[str]) -> Agent:
+        """Add a new agent to its shard and return the parent's mirror of it"""
+        agent = super().add_agent(role, capabilities)
+        self.connections[agent.agent_id % self.n_shards].send(
+            ('add_agent', agent.agent_id, role, capabilities))
+        return agent
+
+    def fetch_agents(self) -> List[Agent]:
+        """Copies of all agents as held by the workers, in id order
+
+        Their current tasks are replaced by the parent's tasks, which first
+        take over the progress of the workers' replicas.
+        """
+        for conn in self.connections:
+            conn.send(('agents',))
+        replies = [conn.recv() for conn in self.connections]
+        agents = list(heapq.merge(*(shard_agents for shard_agents, _ in replies),
+                                  key=lambda agent: agent.agent_id))
+
+        for _, progress in replies:
+            for task_id, value in progress.items():
+                self.task_store.get(task_id).progress = value
+        for agent in agents:
+            if agent.current_task is not None:
+                agent.current_task = self.task_store.get(agent.current_task.task_id)
+        return agents
+
+    def _route_messages(self) -> List[List[Message]]:
+        """Split the queue into per-shard outboxes and mirror task assignments"""
+        outboxes: List[List[Message]] = [[] for _ in range(self.n_shards)]
+        assignments: Dict[int, Optional[Task]] = {}
+        for message in self.message_queue:
+            if message.receiver_id is not None and message.message_type == "task_assignment":
+                assignments[message.receiver_id] = message.content.get("task")  # The last one wins
+
+        # Agents that end up on each task; workers replay the steps of those in other shards
+        holders: Dict[int, List[int]] = {}
+        for agent_id in sorted(assignments):
+            holders.setdefault(assignments[agent_id].task_id, []).append(agent_id)
+        specs: Dict[int, Dict] = {}
+
+        for message in self.message_queue:
+            if message.receiver_id is None:
+                if self.bus.subscribers.get(message.message_type):
+                    for outbox in outboxes:
+                        outbox.append(message)
+                continue
+
+            if message.message_type == "task_assignment":
+                task = message.content.get("task")
+                spec = specs.get(task.task_id)
+                if spec is None:
+                    spec = specs[task.task_id] = {
+                        "task_id": task.task_id,
+                        "complexity": task.complexity,
+                        "requirements": task.requirements,
+                        "team": [(agent.agent_id, agent.role) for agent in task.assigned_agents],
+                        "holders": holders.get(task.task_id, []),
+                    }
+                message = Message(message.sender_id, message.receiver_id, message.message_type, spec)
+            outboxes[message.receiver_id % self.n_shards].append(message)
+
+        self.message_queue.clear()
+
+        # Agents process their mail in id order
+        for agent_id in sorted(assignments):
+            self.agents[agent_id].current_task = assignments[agent_id]
+        return outboxes
+
+    def step(self):
+        """Execute one timestep across all shards"""
+        self.timestep += 1
+        self.assign_tasks()
+
+        # Deliver, process messages, decide and act in every shard
+        for conn, outbox in zip(self.connections, self._route_messages()):
+            conn.send(('step', outbox))
+        replies = [conn.recv() for conn in self.connections]
+
+        # Add score changes to the total in agent id order, as a single process would
+        worked = np.concatenate([reply[1] for reply in replies])
+        order = np.argsort(worked, kind='stable')
+        deltas = np.concatenate([reply[2] for reply in replies])[order]
+        self.total_performance = np.cumsum(np.concatenate(([self.total_performance], deltas)))[-1].item()
+
+        agents = self.agents
+        scores = np.concatenate([reply[3] for reply in replies])[order]
+        for agent_id, score in zip(worked[order].tolist(), scores.tolist()):
+            agents[agent_id]._performance_score = score
+
+        for agent_id in heapq.merge(*(reply[0] for reply in replies)):
+            agents[agent_id].current_task = None
+        outgoing = list(heapq.merge(*(reply[4] for reply in replies),
+                                    key=lambda message: message.sender_id))
+        self.message_queue.extend(outgoing)
+
+        # Move completed tasks out of the active set
+        completed_this_step = [message.content["task_id"] for message in outgoing
+                               if message.message_type == "task_completed"]
+        for task_id in sorted(completed_this_step):
+            task = self.task_store.get(task_id)
+            task.progress = 1.0
+            task.completed = True
+            self.task_store.complete(task)
+
+    def run(self, n_steps: int, event_driven: bool = False) -> Dict:
+        """Advance the simulation by `n_steps` timesteps and return the statistics"""
+        if event_driven:
+            raise ValueError("ShardedMultiAgentSystem does not support event_driven runs")
+        return super().run(n_steps)
+
+    def checkpoint(self, file, compress: bool = False):
+        # The parent's mirrors lack the workers' knowledge and mail
+        raise NotImplementedError("ShardedMultiAgentSystem does not support checkpoints")
+
+    @classmethod
+    def restore(cls, file, check_statistics: bool = False, assignment=None) -> 'MultiAgentSystem':
+        raise NotImplementedError("ShardedMultiAgentSystem does not support checkpoints; "
+                                  "restore with MultiAgentSystem.restore")
+
+    def close(self):
+        """Stop the worker processes"""
+        for conn in self.connections:
+            try:
+                conn.send(('stop',))
+            except OSError:
+                pass  # The worker already exited
+            conn.close()
+        for process in self.processes:
+            process.join()
+        self.connections, self.processes = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncMultiAgentSystem(MultiAgentSystem):
+    """Runs every agent as an asyncio coroutine with its own mailbox
+
+    Instead of moving all agents in lockstep, each agent waits on an
+    asyncio.Queue for mail, processes it and works on its task, awaiting
+    `work(agent, task)` before every work step. Agents whose work waits on
+    I/O (models, tools, databases) therefore do not hold up the others.
+    Task assignment runs in its own coroutine whenever tasks are added or
+    agents become idle. `timestep` is not advanced in this mode.
+    """
+
+    def __init__(self, work: Optional[Callable[[Agent, Task], Awaitable]] = None,
+                 check_statistics: bool = False, assignment=None):
+        super().__init__(check_statistics, assignment)
+        self.work = work
+        self.mailboxes: Dict[int, asyncio.Queue] = {}
+        self._wakeup = asyncio.Event()  # Set when assignment may find something to do
+        self._done = asyncio.Event()    # Set when no agent has anything left to do
+        self._running: List[asyncio.Task] = []
+
+        # Throughput counters
+        self.messages_delivered = 0
+        self.work_steps = 0
+        self.max_queue_depth = 0
+        self.elapsed = 0.0
+
+    def add_agent(self, role: AgentRole, capabilities: List[str]) -> Agent:
+        """Add a new agent; while running, it starts right away"""
+        agent = super().add_agent(role, capabilities)
+        self.mailboxes[agent.agent_id] = asyncio.Queue()
+        if self._running:
+            self._running.append(asyncio.create_task(self._agent_loop(agent)))
+        self._wakeup.set()
+        return agent
+
+    def add_task(self, complexity: float, requirements: List[AgentRole]) -> Task:
+        task = super().add_task(complexity, requirements)
+        self._done.clear()
+        self._wakeup.set()
+        return task
+
+    def on_agent_idle_changed(self, agent: Agent, idle: bool):
+        super().on_agent_idle_changed(agent, idle)
+        if idle:
+            self._wakeup.set()
+
+    def _dispatch(self):
+        """Move queued messages into the receivers' mailboxes"""
+        for message in self.message_queue:
+            if message.receiver_id is None:  # Broadcast
+                recipients = [agent_id for agent_id in self.bus.subscribers.get(message.message_type, {})
+                              if agent_id != message.sender_id]
+            else:
+                recipients = [message.receiver_id]
+
+            for agent_id in recipients:
+                mailbox = self.mailboxes[agent_id]
+                mailbox.put_nowait(message)
+                self.max_queue_depth = max(self.max_queue_depth, mailbox.qsize())
+            self.messages_delivered += len(recipients)
+
+        self.message_queue.clear()
+
+    async def _assign_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            self.assign_tasks()
+            assigned = {message.receiver_id for message in self.message_queue
+                        if message.message_type == "task_assignment"}
+            self._dispatch()
+
+            if not assigned and not self.busy_pool and not any(
+                    mailbox.qsize() for mailbox in self.mailboxes.values()):
+                self._done.set()  # Remaining tasks cannot be staffed right now
+
+            # Let assigned agents pick up their tasks before they are seen as idle again
+            await asyncio.gather(*(self.mailboxes[agent_id].join() for agent_id in assigned))
+
+    async def _agent_loop(self, agent: Agent):
+        mailbox = self.mailboxes[agent.agent_id]
+
+        while True:
+            # Idle agents sleep until mail arrives
+            if agent.current_task is None and not agent.messages and mailbox.empty():
+                agent.receive_message(await mailbox.get())
+                mailbox.task_done()
+            while not mailbox.empty():
+                agent.receive_message(mailbox.get_nowait())
+                mailbox.task_done()
+            agent.process_messages()
+
+            if agent.decide_action() == "work_on_task":
+                task = agent.current_task
+                if self.work is not None:
+                    await self.work(agent, task)
+                    if task.completed:
+                        continue  # A teammate finished it while this agent was waiting
+
+                message = agent.execute_action("work_on_task")
+                self.work_steps += 1
+                if message:
+                    self.message_queue.append(message)
+                    if message.message_type == "task_completed":
+                        self.task_store.complete(task)
+                        if not self.task_store.n_active:
+                            self._done.set()
+                    self._dispatch()
+
+            # Let other agents run between work steps
+            await asyncio.sleep(0)
+
+    async def run_async(self, timeout: Optional[float] = None) -> Dict:
+        """Run all agents until no agent has anything left to do or `timeout` seconds pass
+
+        The run ends once every task is completed, or when all agents are
+        idle with empty mailboxes and no open task can be staffed.
+        Exceptions raised by `work` stop the run and are re-raised here.
+        Runs can be repeated, for example after adding more tasks.
+        """
+        # Events and queues bind to the first event loop that waits on them,
+        # so every run gets fresh ones; mail left from an earlier run carries over
+        self._wakeup = asyncio.Event()
+        self._done = asyncio.Event()
+        for agent_id, previous in self.mailboxes.items():
+            mailbox = asyncio.Queue()
+            while not previous.empty():
+                mailbox.put_nowait(previous.get_nowait())
+            self.mailboxes[agent_id] = mailbox
+
+        if not self.task_store.n_active:
+            self._done.set()
+
+        start = time.perf_counter()
+        self._dispatch()
+        self._wakeup.set()
+        self._running = [asyncio.create_task(self._agent_loop(agent)) for agent in self.agents]
+        self._running.append(asyncio.create_task(self._assign_loop()))
+        waiter = asyncio.create_task(self._done.wait())
+
+        try:
+            done, _ = await asyncio.wait([waiter, *self._running], timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in [waiter, *self._running]:
+                task.cancel()
+            await asyncio.gather(waiter, *self._running, return_exceptions=True)
+            self._running = []
+            self.elapsed += time.perf_counter() - start
+
+        for task in done:
+            if task is not waiter:
+                task.result()  # Agent loops only finish by raising
+
+        return self.get_statistics()
+
+    def checkpoint(self, file, compress: bool = False):
+        """Save the system between runs, see MultiAgentSystem.checkpoint
+
+        Mail still waiting in a mailbox is handed to its agent first, so it
+        is saved with the agent's inbox. Throughput counters are not saved.
+        """
+        if self._running:
+            raise RuntimeError("Cannot checkpoint while run_async is running")
+        for agent_id, mailbox in self.mailboxes.items():
+            while not mailbox.empty():
+                self.agents[agent_id].receive_message(mailbox.get_nowait())
+        super().checkpoint(file, compress)
+
+    @classmethod
+    def restore(cls, file, check_statistics: bool = False, assignment=None, *,
+                work: Optional[Callable[[Agent, Task], Awaitable]] = None) -> 'AsyncMultiAgentSystem':
+        """Rebuild a system from checkpoint() output, with a mailbox per agent"""
+        system = super().restore(file, check_statistics, assignment)
+        system.work = work
+        system.mailboxes = {agent.agent_id: asyncio.Queue() for agent in system.agents}
+        return system
+
+    def get_statistics(self) -> Dict:
+        """System statistics plus throughput and mailbox depths"""
+        stats = super().get_statistics()
+        elapsed = self.elapsed or float('nan')
+        stats.update({
+            'messages_delivered': self.messages_delivered,
+            'work_steps': self.work_steps,
+            'elapsed': self.elapsed,
+            'messages_per_sec': self.messages_delivered / elapsed,
+            'work_steps_per_sec': self.work_steps / elapsed,
+            'tasks_completed_per_sec': len(self.task_store.completed) / elapsed,
+            'queued_messages': sum(mailbox.qsize() for mailbox in self.mailboxes.values()),
+            'max_queue_depth': self.max_queue_depth,
+        })
+        return stats
+
+
+def _grown(array: np.ndarray, size: int, fill=0) -> np.ndarray:
+    """Return `array` with room for at least `size` rows (doubling capacity)"""
+    if size <= len(array):
+        return array
+    grown = np.full((max(size, 2 * len(array)),) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class ColumnarMultiAgentSystem:
+    """Struct-of-arrays variant of MultiAgentSystem for million-agent simulations
+
+    Agents and tasks are rows in NumPy arrays instead of Python objects, and
+    each step updates all agents and tasks with a few vectorized operations.
+    The rules match Task and Agent: an assigned task advances by
+    team_efficiency / (complexity * 10) for each agent working on it, and
+    agents go idle on the step after their task completes.
+
+    Differences from MultiAgentSystem: an agent is reserved as soon as it is
+    picked, so it never holds two tasks at once; every agent working on the
+    completing step is credited; messages are not modelled. Agents and tasks
+    are identified by integer ids rather than objects.
+    """
+
+    ROLES = list(AgentRole)
+    ROLE_INDEX = {role: i for i, role in enumerate(AgentRole)}
+
+    def __init__(self, agent_capacity: int = 1024, task_capacity: int = 1024):
+        n_roles = len(self.ROLES)
+
+        # Agent columns
+        self.n_agents = 0
+        self.agent_roles = np.zeros(agent_capacity, dtype=np.int8)
+        self.agent_capabilities = np.zeros(agent_capacity, dtype=np.int32)
+        self.agent_tasks = np.full(agent_capacity, -1, dtype=np.int64)  # -1 when idle
+        self.performance_scores = np.zeros(agent_capacity)
+        self.capability_sets: List[Tuple[str, ...]] = []
+
+        # Task columns
+        self.n_tasks = 0
+        self.task_complexity = np.ones(task_capacity)
+        self.task_requirements = np.zeros((task_capacity, n_roles), dtype=np.int16)  # agents per role
+        self.task_progress = np.zeros(task_capacity)
+        self.task_assigned = np.zeros(task_capacity, dtype=bool)
+        self.task_completed = np.zeros(task_capacity, dtype=bool)
+
+        self.n_completed = 0
+        self.timestep = 0
+
+    def _capability_id(self, capabilities: List[str]) -> int:
+        key = tuple(capabilities)
+        if key not in self.capability_sets:
+            self.capability_sets.append(key)
+        return self.capability_sets.index(key)
+
+    def add_agents(self, role: AgentRole, count: int, capabilities: List[str]) -> np.ndarray:
+        """Add `count` agents with the same role and return their ids"""
+        start, end = self.n_agents, self.n_agents + count
+        self.agent_roles = _grown(self.agent_roles, end)
+        self.agent_capabilities = _grown(self.agent_capabilities, end)
+        self.agent_tasks = _grown(self.agent_tasks, end, fill=-1)
+        self.performance_scores = _grown(self.performance_scores, end)
+
+        self.agent_roles[start:end] = self.ROLE_INDEX[role]
+        self.agent_capabilities[start:end] = self._capability_id(capabilities)
+        self.n_agents = end
+        return np.arange(start, end)
+
+    def add_agent(self, role: AgentRole, capabilities: List[str]) -> int:
+        """Add a new agent to the system and return its id"""
+        return int(self.add_agents(role, 1, capabilities)[0])
+
+    def add_tasks(self, complexities: np.ndarray, requirements: np.ndarray) -> np.ndarray:
+        """Add tasks from a complexity vector and an (n_tasks, n_roles) count matrix"""
+        complexities = np.asarray(complexities, dtype=float)
+        start, end = self.n_tasks, self.n_tasks + len(complexities)
+        self.task_complexity = _grown(self.task_complexity, end, fill=1.0)
+        self.task_requirements = _grown(self.task_requirements, end)
+        self.task_progress = _grown(self.task_progress, end)
+        self.task_assigned = _grown(self.task_assigned, end)
+        self.task_completed = _grown(self.task_completed, end)
+
+        self.task_complexity[start:end] = complexities
+        self.task_requirements[start:end] = requirements
+        self.n_tasks = end
+        return np.arange(start, end)
+
+    def add_task(self, complexity: float, requirements: List[AgentRole]) -> int:
+        """Add a new task to the system and return its id"""
+        counts = np.zeros((1, len(self.ROLES)), dtype=np.int16)
+        for role in requirements:
+            counts[0, self.ROLE_INDEX[role]] += 1
+        return int(self.add_tasks([complexity], counts)[0])
+
+    @staticmethod
+    def _first_fit(demand: np.ndarray, supply: np.ndarray) -> np.ndarray:
+        """Tasks (rows of `demand`) that in-order, all-or-nothing assignment can staff
+
+        Equivalent to walking the tasks in order and accepting each one whose
+        demand fits the remaining supply, but done in a few cumulative-sum
+        passes: each pass accepts a prefix and rejects every later task that
+        needs more of some role than is left.
+        """
+        accepted = np.zeros(len(demand), dtype=bool)
+        candidate = np.ones(len(demand), dtype=bool)
+        remaining = supply.copy()
+        start = 0
+
+        while start < len(demand):
+            rows = start + np.flatnonzero(candidate[start:])
+            if not len(rows):
+                break
+
+            used = np.cumsum(demand[rows], axis=0)
+            over = np.any(used > remaining, axis=1)
+            first = int(np.argmax(over)) if over.any() else len(rows)
+
+            accepted[rows[:first]] = True
+            if first > 0:
+                remaining = remaining - used[first - 1]
+            if first == len(rows):
+                break
+
+            # Remaining supply only shrinks, so tasks needing more than is left never fit
+            start = rows[first] + 1
+            candidate[rows[first]] = False
+            candidate[start:] &= ~np.any(demand[start:] > remaining, axis=1)
+
+        return accepted
+
+    def assign_tasks(self) -> int:
+        """Staff unassigned tasks in order with random idle agents; returns tasks assigned"""
+        open_tasks = np.flatnonzero(~self.task_assigned[:self.n_tasks])
+        if not len(open_tasks):
+            return 0
+
+        roles = self.agent_roles[:self.n_agents]
+        idle = self.agent_tasks[:self.n_agents] == -1
+        supply = np.bincount(roles[idle], minlength=len(self.ROLES))
+        demand = self.task_requirements[open_tasks].astype(np.int64)
+
+        accepted = self._first_fit(demand, supply)
+        staffed = open_tasks[accepted]
+
+        for role in range(len(self.ROLES)):
+            needed = demand[accepted, role]
+            if not needed.any():
+                continue
+            pool = np.flatnonzero(idle & (roles == role))
+            chosen = np.random.choice(pool, int(needed.sum()), replace=False)
+            self.agent_tasks[chosen] = np.repeat(staffed, needed)
+
+        self.task_assigned[staffed] = True
+        return len(staffed)
+
+    def step(self):
+        """Execute one timestep of the simulation for all agents at once"""
+        self.timestep += 1
+
+        # Assign new tasks
+        self.assign_tasks()
+
+        agent_tasks = self.agent_tasks[:self.n_agents]
+        busy = agent_tasks >= 0
+
+        # decide_action: agents whose task completed go idle
+        finished = np.zeros_like(busy)
+        finished[busy] = self.task_completed[agent_tasks[busy]]
+        agent_tasks[finished] = -1
+
+        # execute_action: every busy agent advances its task
+        working = agent_tasks >= 0
+        worker_tasks = agent_tasks[working]
+        if not len(worker_tasks):
+            return
+
+        # Staffed tasks always have exactly their required team, so team_efficiency is 1
+        progress_step = 1.0 / (self.task_complexity[:self.n_tasks] * 10)
+
+        self.performance_scores[:self.n_agents][working] += progress_step[worker_tasks]
+
+        workers = np.bincount(worker_tasks, minlength=self.n_tasks)
+        progress = self.task_progress[:self.n_tasks]
+        np.minimum(progress + workers * progress_step, 1.0, out=progress)
+
+        newly_completed = (workers > 0) & (progress >= 1.0) & ~self.task_completed[:self.n_tasks]
+        self.task_completed[:self.n_tasks] |= newly_completed
+        self.n_completed += int(np.count_nonzero(newly_completed))
+
+    def get_statistics(self) -> Dict:
+        """Get system statistics (same keys as MultiAgentSystem)"""
+        busy = int(np.count_nonzero(self.agent_tasks[:self.n_agents] >= 0))
+        return {
+            'timestep': self.timestep,
+            'total_agents': self.n_agents,
+            'active_tasks': self.n_tasks - self.n_completed,
+            'completed_tasks': self.n_completed,
+            'idle_agents': self.n_agents - busy,
+            'busy_agents': busy,
+            'avg_performance': self.performance_scores[:self.n_agents].mean() if self.n_agents else 0,
+        }
+
+
+def check_event_driven(seeds=range(50), assignment=MatchingAssignment, n_agents: int = 8,
+                       rounds: int = 10) -> List[int]:
+    """Seeds whose event-driven run differs from calling step() the same number of times
+
+    Each round adds a few tasks and then runs for a few steps, so tasks
+    often arrive while no agent can take them.
+    """
+    mismatches = []
+    for seed in seeds:
+        results = []
+        for event_driven in (False, True):
+            random.seed(seed)
+            np.random.seed(seed)
+            mas = MultiAgentSystem(assignment=assignment())
+            roles = list(AgentRole)
+            for _ in range(n_agents):
+                mas.add_agent(random.choice(roles), [])
+            for _ in range(rounds):
+                for _ in range(random.randint(1, 6)):
+                    mas.add_task(random.uniform(0.5, 3.0), random.sample(roles, random.randint(1, 3)))
+                n_steps = random.randint(1, 15)
+                if event_driven:
+                    mas.run(n_steps, event_driven=True)
+                else:
+                    for _ in range(n_steps):
+                        mas.step()
+            results.append(mas.get_statistics())
+        if results[0] != results[1]:
+            mismatches.append(seed)
+    return mismatches
+
 
 # Demo usage
 if __name__ == "__main__":
@@ -320,6 +1897,11 @@ if __name__ == "__main__":
     print(f"Tasks Completed: {stats['completed_tasks']}/{len(tasks_config)}")
     print(f"Average Agent Performance: {stats['avg_performance']:.3f}")
 
+    for name, strategy in (('random', RandomAssignment), ('matching', lambda: MatchingAssignment(aging=3))):
+        mismatches = check_event_driven(assignment=strategy)
+        print(f"Event-driven runs match step() with {name} assignment: {not mismatches}"
+              + (f" (differs for seeds {mismatches})" if mismatches else ""))
+
     print("\n👥 Agent Performance:")
     for agent in sorted(mas.agents, key=lambda a: a.performance_score, reverse=True):
         status = "🔴 Idle" if agent.current_task is None else "🟢 Busy"
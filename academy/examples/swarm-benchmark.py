@@ -0,0 +1,233 @@
+"""
+Swarm Intelligence Benchmark
+Measures SwarmOptimizer throughput, memory and time-to-target across problem sizes
+
+Usage:
+    python swarm-benchmark.py --quick
+    python swarm-benchmark.py --dimensions 2 100 1000 --particles 30 10000 100000 \
+        --output pso_benchmark.json
+    python swarm-benchmark.py --quick --compare pso_benchmark.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# swarm-intelligence.py is not importable by name because of the hyphen
+_spec = importlib.util.spec_from_file_location(
+    "swarm_intelligence",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "swarm-intelligence.py"))
+swarm = importlib.util.module_from_spec(_spec)
+sys.modules["swarm_intelligence"] = swarm
+_spec.loader.exec_module(swarm)
+
+
+FUNCTIONS = {
+    'sphere': (swarm.sphere_function, (-10, 10)),
+    'rastrigin': (swarm.rastrigin_function, (-5.12, 5.12)),
+    'rosenbrock': (swarm.rosenbrock_function, (-5, 10)),
+}
+
+# Target score per dimension used for the evaluations-to-target metric
+TARGETS_PER_DIMENSION = {
+    'sphere': 1e-3,
+    'rastrigin': 1.0,
+    'rosenbrock': 1.0,
+}
+
+ENGINES = {
+    'vectorized': swarm.VectorizedSwarmOptimizer,
+    'particles': swarm.SwarmOptimizer,
+}
+
+FULL_DIMENSIONS = [2, 10, 100, 1000]
+FULL_PARTICLES = [30, 1000, 10_000, 100_000]
+QUICK_DIMENSIONS = [2, 30]
+QUICK_PARTICLES = [30, 1000]
+
+
+def build_optimizer(function_name: str, dimensions: int, n_particles: int, engine: str):
+    objective, bounds = FUNCTIONS[function_name]
+    return ENGINES[engine](
+        objective_function=objective,
+        dimensions=dimensions,
+        n_particles=n_particles,
+        bounds=bounds,
+        history=swarm.BestScoreHistory()
+    )
+
+
+def run_case(function_name: str, dimensions: int, n_particles: int,
+             iterations: int, engine: str, seed: int) -> Dict:
+    """Run one optimizer configuration and collect its timing metrics"""
+    target = TARGETS_PER_DIMENSION[function_name] * dimensions
+
+    np.random.seed(seed)
+    start = time.perf_counter()
+
+    optimizer = build_optimizer(function_name, dimensions, n_particles, engine)
+    result = optimizer.optimize(max_iterations=iterations, verbose=False)
+
+    elapsed = time.perf_counter() - start
+
+    # First iteration whose global best reached the target
+    iterations_to_target = next(
+        (h['iteration'] + 1 for h in optimizer.history if h['best_score'] <= target), None)
+
+    return {
+        'function': function_name,
+        'dimensions': dimensions,
+        'n_particles': n_particles,
+        'engine': engine,
+        'iterations': result.n_iterations,
+        'evaluations': result.n_evaluations,
+        'seconds': elapsed,
+        'evals_per_sec': result.n_evaluations / elapsed,
+        'iterations_per_sec': result.n_iterations / elapsed,
+        'best_score': float(result.best_score),
+        'target_score': target,
+        'iterations_to_target': iterations_to_target,
+        'evals_to_target': (iterations_to_target * n_particles
+                            if iterations_to_target is not None else None),
+    }
+
+
+def measure_peak_memory(function_name: str, dimensions: int, n_particles: int,
+                        iterations: int, engine: str, seed: int) -> float:
+    """Peak traced allocations in MB of one run
+
+    Allocation tracing slows the run down several times, so this is a
+    separate run from the timed ones.
+    """
+    np.random.seed(seed)
+    tracemalloc.start()
+    try:
+        optimizer = build_optimizer(function_name, dimensions, n_particles, engine)
+        optimizer.optimize(max_iterations=iterations, verbose=False)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak_bytes / 2**20
+
+
+def run_suite(functions: List[str], dimensions: List[int], particles: List[int],
+              iterations: int, engine: str, seed: int, max_cells: int,
+              repeat: int = 1) -> List[Dict]:
+    """Sweep all configurations, skipping those larger than `max_cells` array entries
+
+    Each configuration runs `repeat` times and the fastest run is kept;
+    peak memory comes from one extra run with allocation tracing.
+    """
+    results = []
+
+    for function_name in functions:
+        for dims in dimensions:
+            for n_particles in particles:
+                if dims * n_particles > max_cells:
+                    print(f"  skip {function_name:10s} dims={dims:5d} particles={n_particles:7d} "
+                          f"(> {max_cells} cells)")
+                    continue
+
+                case = max((run_case(function_name, dims, n_particles, iterations, engine, seed)
+                            for _ in range(repeat)),
+                           key=lambda c: c['evals_per_sec'])
+                case['peak_memory_mb'] = measure_peak_memory(function_name, dims, n_particles,
+                                                             iterations, engine, seed)
+                results.append(case)
+                print(f"  {function_name:10s} dims={dims:5d} particles={n_particles:7d} | "
+                      f"{case['evals_per_sec']:12.0f} evals/s | "
+                      f"{case['iterations_per_sec']:8.1f} it/s | "
+                      f"{case['peak_memory_mb']:8.1f} MB | "
+                      f"to target: {case['evals_to_target']}")
+
+    return results
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    """List configurations whose evals/sec dropped more than `tolerance` vs a baseline file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(case):
+        return (case['function'], case['dimensions'], case['n_particles'], case['engine'])
+
+    previous = {key(case): case for case in baseline['results']}
+    regressions = []
+
+    for case in results:
+        old = previous.get(key(case))
+        if old is None:
+            continue
+
+        ratio = case['evals_per_sec'] / old['evals_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append(f"{key(case)}: {ratio:.2f}x evals/sec of baseline")
+
+    return regressions
+
+
+def metadata(args: argparse.Namespace) -> Dict:
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'engine': args.engine,
+        'iterations': args.iterations,
+        'seed': args.seed,
+        'repeat': args.repeat,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark SwarmOptimizer")
+    parser.add_argument('--functions', nargs='+', default=list(FUNCTIONS), choices=list(FUNCTIONS))
+    parser.add_argument('--dimensions', nargs='+', type=int, default=None)
+    parser.add_argument('--particles', nargs='+', type=int, default=None)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--engine', default='vectorized', choices=list(ENGINES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per configuration (fastest kept)")
+    parser.add_argument('--max-cells', type=int, default=20_000_000,
+                        help="skip configurations with more particles x dimensions than this")
+    parser.add_argument('--quick', action='store_true', help="small sweep for smoke testing")
+    parser.add_argument('--output', default='pso_benchmark.json')
+    parser.add_argument('--compare', metavar='BASELINE_JSON',
+                        help="report configurations slower than a previous run")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed evals/sec drop before --compare flags a regression")
+    args = parser.parse_args(argv)
+
+    dimensions = args.dimensions or (QUICK_DIMENSIONS if args.quick else FULL_DIMENSIONS)
+    particles = args.particles or (QUICK_PARTICLES if args.quick else FULL_PARTICLES)
+
+    print("🐝 PSO Benchmark\n")
+    results = run_suite(args.functions, dimensions, particles, args.iterations,
+                        args.engine, args.seed, args.max_cells, args.repeat)
+
+    with open(args.output, 'w') as f:
+        json.dump({'metadata': metadata(args), 'results': results}, f, indent=2)
+    print(f"\n📊 Results written to '{args.output}'")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"⚠️  Regression: {line}")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
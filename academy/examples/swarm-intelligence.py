@@ -5,7 +5,13 @@ Particle Swarm Optimization (PSO) for function optimization
 
 import numpy as np
 import matplotlib.pyplot as plt
-from typing import Callable, Tuple
+import multiprocessing as mp
+import pickle
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import (Executor, ProcessPoolExecutor, ThreadPoolExecutor,
+                                FIRST_COMPLETED, wait)
+from typing import Callable, Iterator, Optional, Tuple
 
 class Particle:
     """Individual particle in the swarm"""
@@ -32,78 +38,838 @@ class Particle:
         self.position = np.clip(self.position, bounds[0], bounds[1])
 
 
+class OptimizationResult(tuple):
+    """(best_position, best_score) pair that also reports how a run ended
+
+    Unpacks like the plain tuple optimize() used to return. `stop_reason` is
+    one of 'max_iterations', 'stagnation', 'target_score', 'max_evaluations',
+    'deadline' or 'cancelled'.
+    """
+
+    def __new__(cls, best_position: np.ndarray, best_score: float,
+                stop_reason: str = 'max_iterations',
+                n_iterations: int = 0, n_evaluations: int = 0):
+        result = super().__new__(cls, (best_position, best_score))
+        result.stop_reason = stop_reason
+        result.n_iterations = n_iterations
+        result.n_evaluations = n_evaluations
+        return result
+
+    def __getnewargs__(self):
+        return (self[0], self[1], self.stop_reason, self.n_iterations, self.n_evaluations)
+
+    @property
+    def best_position(self) -> np.ndarray:
+        return self[0]
+
+    @property
+    def best_score(self) -> float:
+        return self[1]
+
+    def __repr__(self) -> str:
+        return (f"OptimizationResult(best_score={self.best_score}, "
+                f"stop_reason={self.stop_reason!r}, n_iterations={self.n_iterations}, "
+                f"n_evaluations={self.n_evaluations})")
+
+
 class SwarmOptimizer:
     """Particle Swarm Optimization algorithm"""
 
     def __init__(self, objective_function: Callable,
                  dimensions: int = 2,
                  n_particles: int = 30,
-                 bounds: Tuple[float, float] = (-10, 10)):
+                 bounds: Tuple[float, float] = (-10, 10),
+                 w: float = 0.7, c1: float = 1.5, c2: float = 1.5,
+                 evaluator: Optional['ParallelEvaluator'] = None,
+                 history: Optional['HistoryRecorder'] = None,
+                 cache: Optional['EvaluationCache'] = None,
+                 topology: str = 'global',
+                 neighborhood_size: int = 3):
         self.objective_function = objective_function
+        self.evaluator = evaluator
+        self.cache = cache
         self.dimensions = dimensions
         self.n_particles = n_particles
         self.bounds = bounds
+        self.w, self.c1, self.c2 = w, c1, c2
 
         # Initialize swarm
-        self.particles = [Particle(dimensions, bounds) for _ in range(n_particles)]
+        self._init_swarm()
+
+        # Neighbor index array, None for the global-best topology
+        self.topology = topology
+        self.neighbors = build_neighbors(topology, n_particles, neighborhood_size)
 
         # Global best
         self.global_best_position = None
         self.global_best_score = float('inf')
 
-        # History for visualization
-        self.history = []
-
-    def optimize(self, max_iterations: int = 100) -> Tuple[np.ndarray, float]:
-        """Run PSO optimization"""
-
-        for iteration in range(max_iterations):
-            # Evaluate all particles
-            for particle in self.particles:
-                score = self.objective_function(particle.position)
-
-                # Update personal best
-                if score < particle.best_score:
-                    particle.best_score = score
-                    particle.best_position = particle.position.copy()
-
-                # Update global best
-                if score < self.global_best_score:
-                    self.global_best_score = score
-                    self.global_best_position = particle.position.copy()
-
-            # Update all particles
-            for particle in self.particles:
-                particle.update_velocity(self.global_best_position)
-                particle.update_position(self.bounds)
-
-            # Store history
-            self.history.append({
-                'iteration': iteration,
-                'best_score': self.global_best_score,
-                'positions': [p.position.copy() for p in self.particles]
-            })
+        # Objective calls made so far, across all optimize() runs
+        self.n_evaluations = 0
+
+        # Result of the last optimize() / optimize_iter() run
+        self.result = None
 
+        # History for visualization
+        self.history = history if history is not None else FullHistory()
+
+    def _init_swarm(self):
+        """Create the particles"""
+        self.particles = [Particle(self.dimensions, self.bounds) for _ in range(self.n_particles)]
+
+    def _positions(self) -> np.ndarray:
+        """Current positions as an (n_particles, dimensions) array"""
+        return np.array([p.position for p in self.particles])
+
+    def _evaluate(self, positions: np.ndarray) -> np.ndarray:
+        """Score every row of `positions`, reusing cached scores when enabled"""
+        if self.cache is not None:
+            return self.cache.evaluate(positions, self._call_objective)
+        return self._call_objective(positions)
+
+    def _call_objective(self, positions: np.ndarray) -> np.ndarray:
+        """Call the objective on every row of `positions`"""
+        self.n_evaluations += len(positions)
+        if self.evaluator is not None:
+            return self.evaluator(self.objective_function, positions)
+        return evaluate_batch(self.objective_function, positions)
+
+    @property
+    def cache_hits(self) -> int:
+        return self.cache.hits if self.cache is not None else 0
+
+    @property
+    def cache_misses(self) -> int:
+        return self.cache.misses if self.cache is not None else 0
+
+    def _update_bests(self, scores: np.ndarray):
+        """Update personal and global bests from this generation's scores"""
+        for particle, score in zip(self.particles, scores):
+            # Update personal best
+            if score < particle.best_score:
+                particle.best_score = score
+                particle.best_position = particle.position.copy()
+
+            # Update global best
+            if score < self.global_best_score:
+                self.global_best_score = score
+                self.global_best_position = particle.position.copy()
+
+    def _social_best(self) -> np.ndarray:
+        """Best position each particle follows: the global best or its neighborhood best"""
+        if self.neighbors is None:
+            return self.global_best_position
+
+        best_scores = np.array([p.best_score for p in self.particles])
+        best_positions = np.array([p.best_position for p in self.particles])
+        return best_positions[neighborhood_best(self.neighbors, best_scores)]
+
+    def _move(self):
+        """Update velocities and positions of all particles"""
+        social_best = self._social_best()
+        for i, particle in enumerate(self.particles):
+            target = social_best if self.neighbors is None else social_best[i]
+            particle.update_velocity(target, self.w, self.c1, self.c2)
+            particle.update_position(self.bounds)
+
+    def optimize(self, max_iterations: int = 100,
+                 stagnation_window: Optional[int] = None,
+                 tolerance: float = 0.0,
+                 target_score: Optional[float] = None,
+                 max_evaluations: Optional[int] = None,
+                 deadline: Optional[float] = None,
+                 verbose: bool = True,
+                 callback: Optional[Callable[[dict], Optional[bool]]] = None) -> 'OptimizationResult':
+        """Run PSO optimization
+
+        The run ends early when any of the optional criteria is met:
+        - stagnation_window: the global best improved by no more than
+          `tolerance` over the last `stagnation_window` iterations
+        - target_score: the global best reached `target_score` or lower
+        - max_evaluations: this run made at least `max_evaluations` objective
+          calls (checked after each generation, so it can overshoot by less
+          than one generation)
+        - deadline: `deadline` seconds of wall-clock time have passed
+
+        Progress is printed every 10 iterations unless `verbose` is False.
+        `callback` receives the per-iteration stats from optimize_iter();
+        returning True stops the run with stop_reason 'cancelled'.
+        The result unpacks as (best_position, best_score) and records the
+        stop reason, iterations run and objective evaluations used.
+        """
+        run = self.optimize_iter(max_iterations, stagnation_window, tolerance,
+                                 target_score, max_evaluations, deadline)
+
+        for stats in run:
             # Print progress
-            if iteration % 10 == 0:
-                print(f"Iteration {iteration}: Best score = {self.global_best_score:.6f}")
+            if verbose and stats['iteration'] % 10 == 0:
+                print(f"Iteration {stats['iteration']}: Best score = {stats['best_score']:.6f}")
+
+            if callback is not None and callback(stats):
+                run.close()
+                break
+
+        return self.result
+
+    def optimize_iter(self, max_iterations: int = 100,
+                      stagnation_window: Optional[int] = None,
+                      tolerance: float = 0.0,
+                      target_score: Optional[float] = None,
+                      max_evaluations: Optional[int] = None,
+                      deadline: Optional[float] = None) -> Iterator[dict]:
+        """Run PSO optimization, yielding stats after every iteration
+
+        Each item is a dict with 'iteration', 'best_score', 'n_evaluations'
+        (objective calls in this run) and 'elapsed' (seconds). Stopping
+        criteria are the same as for optimize(). Breaking out of the loop
+        cancels the run. The final OptimizationResult is stored in
+        `self.result`, with stop_reason 'cancelled' if the caller stopped it.
+        """
+        start_time = time.monotonic()
+        start_evaluations = self.n_evaluations
+        recent_bests = deque(maxlen=stagnation_window + 1) if stagnation_window else None
+        stop_reason = None
+        iterations_run = 0
+
+        try:
+            for iteration in range(max_iterations):
+                # Evaluate all particles
+                scores = self._evaluate(self._positions())
+                self._update_bests(scores)
+
+                # Update all particles
+                self._move()
+
+                # Store history
+                self.history.record(iteration, self.global_best_score, self._positions())
+
+                iterations_run = iteration + 1
+                evaluations = self.n_evaluations - start_evaluations
+                elapsed = time.monotonic() - start_time
+
+                # Check stopping criteria
+                if recent_bests is not None:
+                    recent_bests.append(self.global_best_score)
+
+                if target_score is not None and self.global_best_score <= target_score:
+                    stop_reason = 'target_score'
+                elif (recent_bests is not None and len(recent_bests) == recent_bests.maxlen
+                        and recent_bests[0] - recent_bests[-1] <= tolerance):
+                    stop_reason = 'stagnation'
+                elif max_evaluations is not None and evaluations >= max_evaluations:
+                    stop_reason = 'max_evaluations'
+                elif deadline is not None and elapsed >= deadline:
+                    stop_reason = 'deadline'
+
+                yield {
+                    'iteration': iteration,
+                    'best_score': self.global_best_score,
+                    'n_evaluations': evaluations,
+                    'elapsed': elapsed,
+                }
+
+                if stop_reason is not None:
+                    break
+        except GeneratorExit:
+            stop_reason = stop_reason or 'cancelled'
+            raise
+        finally:
+            self.result = OptimizationResult(self.global_best_position, self.global_best_score,
+                                             stop_reason or 'max_iterations', iterations_run,
+                                             self.n_evaluations - start_evaluations)
+
+        return self.result
+
+
+class VectorizedSwarmOptimizer(SwarmOptimizer):
+    """PSO engine that keeps the whole swarm in (n_particles, dimensions) arrays
+
+    Each iteration is a handful of array operations instead of a Python loop
+    over particles. Random numbers are drawn in the same order as the
+    Particle-based engine, so both produce the same results for the same
+    `np.random.seed`.
+    """
+
+    def _init_swarm(self):
+        """Allocate position, velocity and personal-best arrays"""
+        low, high = self.bounds
+
+        # Same draws as Particle.__init__: position then velocity, particle by particle
+        u = np.random.random((self.n_particles, 2, self.dimensions))
+        self.positions = low + (high - low) * u[:, 0]
+        self.velocities = -1 + 2 * u[:, 1]
+
+        self.best_positions = self.positions.copy()
+        self.best_scores = np.full(self.n_particles, np.inf)
+
+    def _positions(self) -> np.ndarray:
+        return self.positions
+
+    def _update_bests(self, scores: np.ndarray):
+        improved = scores < self.best_scores
+        self.best_scores[improved] = scores[improved]
+        self.best_positions[improved] = self.positions[improved]
+
+        # argmin picks the first minimum, like the sequential strict '<' update
+        best = int(np.argmin(scores))
+        if scores[best] < self.global_best_score:
+            self.global_best_score = scores[best]
+            self.global_best_position = self.positions[best].copy()
+
+    def _social_best(self) -> np.ndarray:
+        if self.neighbors is None:
+            return self.global_best_position
+        return self.best_positions[neighborhood_best(self.neighbors, self.best_scores)]
+
+    def _move(self):
+        r = np.random.random((self.n_particles, 2))
+        r1, r2 = r[:, 0:1], r[:, 1:2]
+
+        cognitive = self.c1 * r1 * (self.best_positions - self.positions)
+        social = self.c2 * r2 * (self._social_best() - self.positions)
+
+        self.velocities = self.w * self.velocities + cognitive + social
+        self.positions += self.velocities
+        self.positions = np.clip(self.positions, self.bounds[0], self.bounds[1])
+
+    def emigrants(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Copies of the k best personal-best positions and their scores"""
+        best = np.argsort(self.best_scores, kind='stable')[:k]
+        return self.best_positions[best].copy(), self.best_scores[best].copy()
+
+    def inject(self, positions: np.ndarray, scores: np.ndarray):
+        """Replace the worst particles with migrants from another swarm"""
+        if len(positions) == 0:
+            return
+
+        worst = np.argsort(self.best_scores, kind='stable')[::-1][:len(positions)]
+        self.positions[worst] = positions
+        self.best_positions[worst] = positions
+        self.best_scores[worst] = scores
+
+        best = int(np.argmin(scores))
+        if scores[best] < self.global_best_score:
+            self.global_best_score = scores[best]
+            self.global_best_position = positions[best].copy()
+
+
+def build_neighbors(topology: str, n_particles: int, size: int = 3) -> Optional[np.ndarray]:
+    """Precompute each particle's neighborhood as an (n_particles, k) index array
+
+    'global'      - None: every particle follows the global best
+    'ring'        - the particle and its size // 2 neighbors on either side
+    'von_neumann' - the particle and its 4 neighbors on a wrapped 2-D grid
+    'random'      - the particle and `size` informants drawn once at random
+
+    Every neighborhood includes the particle itself.
+    """
+    index = np.arange(n_particles)[:, None]
+
+    if topology == 'global':
+        return None
+    if topology == 'ring':
+        radius = max(1, size // 2)
+        offsets = np.arange(-radius, radius + 1)
+    elif topology == 'von_neumann':
+        columns = max(1, int(np.sqrt(n_particles)))
+        offsets = np.array([0, -1, 1, -columns, columns])
+    elif topology == 'random':
+        informants = np.random.randint(0, n_particles, (n_particles, size))
+        return np.hstack([index, informants])
+    else:
+        raise ValueError(f"Unknown topology: {topology}")
+
+    return (index + offsets) % n_particles
+
+
+def neighborhood_best(neighbors: np.ndarray, best_scores: np.ndarray) -> np.ndarray:
+    """Index of the best personal best in each particle's neighborhood"""
+    local = np.argmin(best_scores[neighbors], axis=1)
+    return neighbors[np.arange(len(neighbors)), local]
+
+
+def _transferable(error: Exception) -> Exception:
+    """`error` if it survives a pickle round trip, else a RuntimeError with its message"""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _island_worker(conn, seed: int, objective_function: Callable, swarm_kwargs: dict):
+    """Runs one island's swarm in a worker process, driven over a pipe
+
+    Replies are ('ok', result) or ('error', exception), so failures in the
+    objective reach the parent instead of killing the pipe.
+    """
+    failure = None
+    try:
+        np.random.seed(seed)
+        optimizer = VectorizedSwarmOptimizer(objective_function, history=NoHistory(), **swarm_kwargs)
+    except Exception as error:
+        failure = error
+
+    while True:
+        command = conn.recv()
+        if command[0] == 'stop':
+            break
+
+        try:
+            if failure is not None:
+                raise failure
+
+            _, n_iterations, n_migrants, immigrants = command
+            if immigrants is not None:
+                optimizer.inject(*immigrants)
+
+            optimizer.optimize(n_iterations, verbose=False)
+            reply = ('ok', (optimizer.global_best_position, optimizer.global_best_score,
+                            optimizer.n_evaluations, optimizer.emigrants(n_migrants)))
+        except Exception as error:
+            reply = ('error', _transferable(error))
+
+        conn.send(reply)
+
+    conn.close()
+
+
+class IslandSwarmOptimizer:
+    """Island-model PSO: independent swarms in separate processes with migration
+
+    Each of the `n_islands` swarms runs `migration_interval` iterations on its
+    own core, then sends copies of its `n_migrants` best particles to the next
+    island in a ring, where they replace the worst particles. Islands keep
+    diversity on multimodal objectives while still sharing good solutions.
+    `n_particles` is per island. The objective must be picklable.
+    """
+
+    def __init__(self, objective_function: Callable,
+                 dimensions: int = 2,
+                 n_particles: int = 30,
+                 bounds: Tuple[float, float] = (-10, 10),
+                 n_islands: int = 4,
+                 migration_interval: int = 10,
+                 n_migrants: int = 2,
+                 seed: Optional[int] = None,
+                 **swarm_kwargs):
+        if n_islands < 1:
+            raise ValueError(f"n_islands must be at least 1, got {n_islands}")
+        if migration_interval < 1:
+            raise ValueError(f"migration_interval must be at least 1, got {migration_interval}")
+
+        self.objective_function = objective_function
+        self.n_islands = n_islands
+        self.migration_interval = migration_interval
+        self.n_migrants = n_migrants
+        self.seed = seed
+        self.swarm_kwargs = dict(dimensions=dimensions, n_particles=n_particles,
+                                 bounds=bounds, **swarm_kwargs)
+
+        self.global_best_position = None
+        self.global_best_score = float('inf')
+        self.island_best_scores = [float('inf')] * n_islands
+        self.n_evaluations = 0
+
+    def optimize(self, max_iterations: int = 100, verbose: bool = True) -> OptimizationResult:
+        """Run all islands for `max_iterations` iterations each"""
+        seeds = np.random.SeedSequence(self.seed).generate_state(self.n_islands)
+        connections, processes = [], []
+
+        for island in range(self.n_islands):
+            parent_conn, child_conn = mp.Pipe()
+            process = mp.Process(target=_island_worker,
+                                 args=(child_conn, int(seeds[island]),
+                                       self.objective_function, self.swarm_kwargs),
+                                 daemon=True)
+            process.start()
+            child_conn.close()
+            connections.append(parent_conn)
+            processes.append(process)
+
+        try:
+            immigrants = [None] * self.n_islands
+            evaluations = [0] * self.n_islands
+            done = 0
+
+            while done < max_iterations:
+                epoch = min(self.migration_interval, max_iterations - done)
+
+                # Start every island before waiting on any of them
+                for conn, incoming in zip(connections, immigrants):
+                    conn.send(('run', epoch, self.n_migrants, incoming))
+
+                replies = []
+                for conn in connections:
+                    status, reply = conn.recv()
+                    if status == 'error':
+                        raise reply
+                    replies.append(reply)
+                done += epoch
+
+                for island, (position, score, n_evals, emigrants) in enumerate(replies):
+                    self.island_best_scores[island] = score
+                    evaluations[island] = n_evals
+                    if score < self.global_best_score:
+                        self.global_best_score = score
+                        self.global_best_position = position
+
+                    # Ring migration: island i sends to island i + 1
+                    immigrants[(island + 1) % self.n_islands] = emigrants
+
+                if verbose:
+                    print(f"Iteration {done}: Best score = {self.global_best_score:.6f}")
+
+            self.n_evaluations = sum(evaluations)
+        finally:
+            for conn in connections:
+                try:
+                    conn.send(('stop',))
+                except OSError:
+                    pass  # The worker already exited
+                conn.close()
+            for process in processes:
+                process.join()
+
+        return OptimizationResult(self.global_best_position, self.global_best_score,
+                                  'max_iterations', max_iterations, self.n_evaluations)
+
+
+class HistoryRecorder:
+    """Keeps per-iteration snapshots of a run
+
+    Entries read back as dicts with 'iteration', 'best_score' and 'positions'
+    keys, and the recorder can be indexed, sliced and iterated like a list.
+    Subclasses decide which snapshots are kept and where they live.
+    """
+
+    def __init__(self):
+        self.entries = []
+
+    def record(self, iteration: int, best_score: float, positions: np.ndarray):
+        """Called once per iteration with the current swarm positions"""
+        raise NotImplementedError
+
+    def _entry(self, index: int) -> dict:
+        return self.entries[index]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(i) for i in range(len(self))[index]]
+        return self._entry(range(len(self))[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._entry(i)
+
+
+class FullHistory(HistoryRecorder):
+    """Copies every particle position on every iteration (unbounded)"""
+
+    def record(self, iteration: int, best_score: float, positions: np.ndarray):
+        self.entries.append({
+            'iteration': iteration,
+            'best_score': best_score,
+            'positions': positions.copy()
+        })
+
+
+class NoHistory(HistoryRecorder):
+    """Records nothing"""
+
+    def record(self, iteration: int, best_score: float, positions: np.ndarray):
+        pass
+
+
+class BestScoreHistory(HistoryRecorder):
+    """Records only the best score per iteration; 'positions' is None"""
+
+    def record(self, iteration: int, best_score: float, positions: np.ndarray):
+        self.entries.append({
+            'iteration': iteration,
+            'best_score': best_score,
+            'positions': None
+        })
+
+
+class DecimatedHistory(FullHistory):
+    """Records a full snapshot every `every` iterations"""
+
+    def __init__(self, every: int = 10):
+        super().__init__()
+        self.every = every
+
+    def record(self, iteration: int, best_score: float, positions: np.ndarray):
+        if iteration % self.every == 0:
+            super().record(iteration, best_score, positions)
+
+
+class RingBufferHistory(HistoryRecorder):
+    """Keeps the last `capacity` snapshots in a preallocated array"""
+
+    def __init__(self, capacity: int = 100):
+        super().__init__()
+        self.capacity = capacity
+        self.positions = None
+        self.iterations = np.zeros(capacity, dtype=np.int64)
+        self.best_scores = np.zeros(capacity)
+        self.count = 0
+
+    def record(self, iteration: int, best_score: float, positions: np.ndarray):
+        if self.positions is None:
+            self.positions = np.empty((self.capacity,) + positions.shape)
+
+        slot = self.count % self.capacity
+        self.positions[slot] = positions
+        self.iterations[slot] = iteration
+        self.best_scores[slot] = best_score
+        self.count += 1
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
 
-        return self.global_best_position, self.global_best_score
+    def _entry(self, index: int) -> dict:
+        # Oldest retained snapshot first
+        slot = (self.count - len(self) + index) % self.capacity
+        return {
+            'iteration': int(self.iterations[slot]),
+            'best_score': float(self.best_scores[slot]),
+            'positions': self.positions[slot].copy()  # The slot is reused `capacity` records later
+        }
+
+
+class MemmapHistory(HistoryRecorder):
+    """Spills position snapshots to a memory-mapped .npy file
+
+    The file holds an array of shape (max_snapshots, n_particles, dimensions)
+    and can be reopened with `np.load(path, mmap_mode='r')` after the run;
+    only the first `len(history)` rows are filled. Best scores stay in memory.
+    Snapshots beyond `max_snapshots` are counted in `dropped` and not stored.
+    """
+
+    def __init__(self, path: str, max_snapshots: int, every: int = 1):
+        super().__init__()
+        self.path = path
+        self.max_snapshots = max_snapshots
+        self.every = every
+        self.positions = None
+        self.dropped = 0
+
+    def record(self, iteration: int, best_score: float, positions: np.ndarray):
+        if iteration % self.every != 0:
+            return
+        if len(self.entries) >= self.max_snapshots:
+            self.dropped += 1
+            return
+
+        if self.positions is None:
+            self.positions = np.lib.format.open_memmap(
+                self.path, mode='w+', dtype=positions.dtype,
+                shape=(self.max_snapshots,) + positions.shape)
+
+        self.positions[len(self.entries)] = positions
+        self.entries.append((iteration, best_score))
+
+    def flush(self):
+        """Write pending snapshots to disk"""
+        if self.positions is not None:
+            self.positions.flush()
+
+    def _entry(self, index: int) -> dict:
+        iteration, best_score = self.entries[index]
+        return {
+            'iteration': iteration,
+            'best_score': best_score,
+            'positions': self.positions[index]
+        }
+
+
+def batched(objective_function: Callable) -> Callable:
+    """Mark an objective as accepting an (n, dims) matrix and returning n scores"""
+    objective_function.batched = True
+    return objective_function
+
+
+def evaluate_batch(objective_function: Callable, positions: np.ndarray) -> np.ndarray:
+    """Score every row of `positions` with a single call if the objective is batched
+
+    Objectives without the `batched` marker are called once per row.
+    """
+    if getattr(objective_function, 'batched', False):
+        scores = np.asarray(objective_function(positions), dtype=float)
+        if scores.shape != (len(positions),):
+            raise ValueError(f"Batched objective returned shape {scores.shape}, "
+                             f"expected ({len(positions)},)")
+        return scores
+
+    return np.array([objective_function(x) for x in positions], dtype=float)
+
+
+class EvaluationCache:
+    """LRU cache of objective scores keyed on quantized positions
+
+    Positions are rounded to a grid of spacing `resolution`, so points closer
+    than that share one score (the score of the first point seen). At most
+    `max_size` scores are kept; the least recently used are evicted first.
+    Repeated points within one generation are evaluated only once.
+    """
+
+    def __init__(self, resolution: float = 1e-9, max_size: int = 100_000):
+        self.resolution = resolution
+        self.max_size = max_size
+        self.scores = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _keys(self, positions: np.ndarray) -> list:
+        # Grid indices stay floats: an int64 cast overflows for |x| / resolution > 2**63.
+        # Adding 0.0 turns -0.0 into 0.0 so both share a key
+        grid = np.round(positions / self.resolution) + 0.0
+        return [row.tobytes() for row in grid]
+
+    def evaluate(self, positions: np.ndarray,
+                 objective: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """Score every row of `positions`, calling `objective` only on misses"""
+        scores = np.empty(len(positions))
+        missing = {}
+
+        for i, key in enumerate(self._keys(positions)):
+            if key in self.scores:
+                self.scores.move_to_end(key)
+                scores[i] = self.scores[key]
+                self.hits += 1
+            elif key in missing:
+                missing[key].append(i)
+                self.hits += 1
+            else:
+                missing[key] = [i]
+                self.misses += 1
+
+        if missing:
+            first_rows = [rows[0] for rows in missing.values()]
+            new_scores = objective(positions[first_rows])
+
+            for (key, rows), score in zip(missing.items(), new_scores):
+                scores[rows] = score
+                self.scores[key] = score
+
+            while len(self.scores) > self.max_size:
+                self.scores.popitem(last=False)
+
+        return scores
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+
+class ParallelEvaluator:
+    """Scores a whole generation concurrently for expensive objectives
+
+    kind='thread'  - one task per position on a thread pool (I/O bound or GIL-releasing objectives)
+    kind='process' - one task per position on a process pool (CPU bound Python objectives)
+    kind='chunked' - batches of `chunk_size` positions per process task, which
+                     amortizes pickling when single evaluations are cheap
+
+    At most `max_in_flight` positions are being evaluated at a time; with
+    chunks, that is `max_in_flight // chunk_size` chunks, and chunks are
+    made no larger than `max_in_flight`. Scores are returned
+    in position order, so the optimizer updates its bests deterministically.
+    An existing `executor` can be passed instead of `kind`; it is not shut
+    down by `close()`.
+    """
+
+    def __init__(self, kind: str = 'thread',
+                 max_workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None,
+                 chunk_size: Optional[int] = None,
+                 executor: Optional[Executor] = None):
+        if kind not in ('thread', 'process', 'chunked'):
+            raise ValueError(f"Unknown evaluator kind: {kind}")
+
+        self.kind = kind
+        self.max_in_flight = max_in_flight
+        self.chunk_size = chunk_size
+        self._owns_executor = executor is None
+
+        if executor is not None:
+            self.executor = executor
+        elif kind == 'thread':
+            self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+        self.max_workers = getattr(self.executor, '_max_workers', max_workers or 1)
+
+    def _chunk_size(self, n_positions: int) -> int:
+        if self.chunk_size:
+            return self.chunk_size
+        if self.kind == 'chunked':
+            # A few chunks per worker keeps the pool busy without tiny tasks
+            return max(1, -(-n_positions // (4 * self.max_workers)))
+        return 1
+
+    def __call__(self, objective_function: Callable, positions: np.ndarray) -> np.ndarray:
+        """Score every row of `positions` and return the scores in row order"""
+        size = self._chunk_size(len(positions))
+        if self.max_in_flight:
+            size = min(size, self.max_in_flight)
+        starts = list(range(0, len(positions), size))
+        # max_in_flight counts evaluations, each task carries `size` of them
+        limit = max(1, self.max_in_flight // size) if self.max_in_flight else len(starts)
+
+        scores = np.empty(len(positions))
+        pending = {}
+        next_chunk = 0
+
+        while next_chunk < len(starts) or pending:
+            # Keep at most `limit` tasks in flight
+            while next_chunk < len(starts) and len(pending) < limit:
+                start = starts[next_chunk]
+                future = self.executor.submit(evaluate_batch, objective_function,
+                                              positions[start:start + size])
+                pending[future] = start
+                next_chunk += 1
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start = pending.pop(future)
+                chunk_scores = future.result()
+                scores[start:start + len(chunk_scores)] = chunk_scores
+
+        return scores
+
+    def close(self):
+        """Shut down the worker pool if this evaluator created it"""
+        if self._owns_executor:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 # Example objective functions
+# They accept a single vector or an (n, dims) matrix of vectors.
+@batched
 def sphere_function(x: np.ndarray) -> float:
     """Simple sphere function: f(x) = sum(x^2)"""
-    return np.sum(x**2)
+    return np.sum(x**2, axis=-1)
 
+@batched
 def rastrigin_function(x: np.ndarray) -> float:
     """Rastrigin function: complex multimodal function"""
-    n = len(x)
-    return 10 * n + np.sum(x**2 - 10 * np.cos(2 * np.pi * x))
+    n = x.shape[-1]
+    return 10 * n + np.sum(x**2 - 10 * np.cos(2 * np.pi * x), axis=-1)
 
+@batched
 def rosenbrock_function(x: np.ndarray) -> float:
     """Rosenbrock function: valley-shaped function"""
-    return np.sum(100 * (x[1:] - x[:-1]**2)**2 + (1 - x[:-1])**2)
+    return np.sum(100 * (x[..., 1:] - x[..., :-1]**2)**2 + (1 - x[..., :-1])**2, axis=-1)
 
 
 # Demo usage
@@ -165,6 +931,8 @@ if __name__ == "__main__":
         # Plot 2: Particle positions over time (2D projection)
         colors = plt.cm.viridis(np.linspace(0, 1, len(optimizer.history)))
         for i, history in enumerate(optimizer.history[::10]):  # Every 10th iteration
+            if history['positions'] is None:
+                continue
             positions = np.array(history['positions'])
             ax2.scatter(positions[:, 0], positions[:, 1],
                        c=[colors[i]], alpha=0.6, s=30)